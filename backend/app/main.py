@@ -1,8 +1,18 @@
-from fastapi import FastAPI
+import os
+import time
+import threading
+from contextlib import ExitStack
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from starlette.middleware.sessions import SessionMiddleware
 
-from app.routers import auth, docs, query_routes
+from app.routers import auth, docs, health, query_routes
+from app.services.health import health_monitor
+from app.services.metrics import HTTP_REQUEST_SECONDS, get_tracer, render_metrics, route_template
+from app.workflows.ingest_jobs import job_manager
+from app.workflows.query_docs import warm_up as warm_up_query_pipeline
 
 app = FastAPI(title="DocuMind Backend 🚀")
 
@@ -21,11 +31,38 @@ app.add_middleware(
 # ✅ Session Middleware with cross-site cookie
 app.add_middleware(
     SessionMiddleware,
-    secret_key="super-secret-session-key",
+    # Must be identical on every worker so any of them can read the session
+    secret_key=os.getenv("SESSION_SECRET_KEY", "super-secret-session-key"),
     same_site="none",   # cross-site cookies ke liye
     https_only=True    # local dev ke liye (render me https hota hi hai)
 )
 
+# ✅ Request latency per route template (+ OTLP server span when tracing is on)
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    tracer = get_tracer()
+    started = time.perf_counter()
+    status = 500
+    with ExitStack() as stack:
+        span = None
+        if tracer is not None:
+            span = stack.enter_context(tracer.start_as_current_span(f"{request.method} {request.url.path}"))
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Template (/documents/jobs/{job_id}), not the raw path, keeps label cardinality bounded
+            route = route_template(request.scope) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=request.method, route=route, status=str(status)
+            )
+            if span is not None:
+                span.update_name(f"{request.method} {route}")
+                span.set_attribute("http.route", route)
+                span.set_attribute("http.response.status_code", status)
+
+
 # ✅ Routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 print("🔐 Auth routes registered at /auth")
@@ -36,6 +73,49 @@ print("📄 Docs routes registered at /documents")
 app.include_router(query_routes.router, prefix="/query", tags=["Query Docs"])
 print("🤖 Query routes registered at /query")
 
+app.include_router(health.router, prefix="/health", tags=["Health"])
+print("🩺 Health routes registered at /health")
+
+
+# ✅ Startup: warm Chroma, the model clients, prebuilt chains and tokenizer in the background
+# (logs cold-start time per step and the remaining per-request overhead)
+@app.on_event("startup")
+def warm_up():
+    threading.Thread(target=warm_up_query_pipeline, name="startup-warmup", daemon=True).start()
+    print("🔥 Vector store + query pipeline warm-up started")
+
+
+# ✅ Startup: ingestion job workers (resumes jobs interrupted by a restart)
+@app.on_event("startup")
+def start_ingest_jobs():
+    job_manager.start()
+
+
+@app.on_event("shutdown")
+def stop_ingest_jobs():
+    job_manager.stop()
+
+
+# ✅ Startup: background health probes (vector store, embeddings, LLM)
+@app.on_event("startup")
+def start_health_monitor():
+    health_monitor.start()
+
+
+@app.on_event("shutdown")
+def stop_health_monitor():
+    health_monitor.stop()
+
+
+# ✅ Readiness (kept for existing load balancer configs; same as /health/ready)
+app.add_api_route("/ready", health.ready, methods=["GET"], include_in_schema=False)
+
+
+# ✅ Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 
 # ✅ Root endpoints
 @app.get("/")
@@ -1,2 +1,160 @@
-# Temporary in-memory token storage
-tokens_db = {}
+import os
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TOKEN_STORE_BACKEND = os.getenv("TOKEN_STORE_BACKEND", "sqlite")  # sqlite | memory
+TOKEN_STORE_PATH = os.getenv("TOKEN_STORE_PATH", "./token_store/tokens.sqlite")
+TOKEN_CACHE_MAX_USERS = int(os.getenv("TOKEN_CACHE_MAX_USERS", "1024"))
+# Other worker processes may refresh a token; re-read the backend after this long
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "30"))
+
+
+# -----------------------------
+# Token stores (keyed by Google user id)
+# -----------------------------
+class TokenStore(ABC):
+    """Per-user OAuth token info: {"token", "refresh_token", "id_token", "expiry", "user_info"}."""
+
+    @abstractmethod
+    def get(self, user_key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, user_key: str, token_info: dict):
+        ...
+
+    @abstractmethod
+    def delete(self, user_key: str):
+        ...
+
+    def update(self, user_key: str, **fields):
+        token_info = self.get(user_key)
+        if token_info is not None:
+            self.set(user_key, {**token_info, **fields})
+
+    def __contains__(self, user_key: str) -> bool:
+        return self.get(user_key) is not None
+
+
+class MemoryTokenStore(TokenStore):
+    """Process-local store (single worker / dev only: lost on restart)."""
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_key: str) -> Optional[dict]:
+        with self._lock:
+            token_info = self._tokens.get(user_key)
+            return dict(token_info) if token_info is not None else None
+
+    def set(self, user_key: str, token_info: dict):
+        with self._lock:
+            self._tokens[user_key] = dict(token_info)
+
+    def delete(self, user_key: str):
+        with self._lock:
+            self._tokens.pop(user_key, None)
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Persistent store shared by every uvicorn worker on the host: SQLite in
+    WAL mode handles the cross-process locking, a busy timeout absorbs
+    concurrent writes.
+    """
+
+    def __init__(self, path: str = TOKEN_STORE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens (user_key TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, user_key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM tokens WHERE user_key = ?", (user_key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, user_key: str, token_info: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tokens (user_key, data, updated_at) VALUES (?, ?, ?)",
+                (user_key, json.dumps(token_info), time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, user_key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM tokens WHERE user_key = ?", (user_key,))
+            self._conn.commit()
+
+
+class CachedTokenStore(TokenStore):
+    """In-memory LRU (with a short TTL) in front of a shared backend store."""
+
+    def __init__(
+        self,
+        backend: TokenStore,
+        max_users: int = TOKEN_CACHE_MAX_USERS,
+        ttl_seconds: float = TOKEN_CACHE_TTL_SECONDS,
+    ):
+        self.backend = backend
+        self.max_users = max_users
+        self.ttl = ttl_seconds
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # user_key → (loaded_at, token_info)
+        self._lock = threading.Lock()
+
+    def _remember(self, user_key: str, token_info: dict):
+        with self._lock:
+            self._cache[user_key] = (time.time(), token_info)
+            self._cache.move_to_end(user_key)
+            while len(self._cache) > self.max_users:
+                self._cache.popitem(last=False)
+
+    def get(self, user_key: str) -> Optional[dict]:
+        with self._lock:
+            cached = self._cache.get(user_key)
+            if cached is not None and time.time() - cached[0] < self.ttl:
+                self._cache.move_to_end(user_key)
+                return dict(cached[1])
+        token_info = self.backend.get(user_key)
+        if token_info is None:
+            with self._lock:
+                self._cache.pop(user_key, None)
+            return None
+        self._remember(user_key, token_info)
+        return dict(token_info)
+
+    def set(self, user_key: str, token_info: dict):
+        self.backend.set(user_key, token_info)
+        self._remember(user_key, dict(token_info))
+
+    def delete(self, user_key: str):
+        self.backend.delete(user_key)
+        with self._lock:
+            self._cache.pop(user_key, None)
+
+
+def create_token_store(backend: str = TOKEN_STORE_BACKEND) -> TokenStore:
+    if backend == "memory":
+        return MemoryTokenStore()
+    if backend == "sqlite":
+        logger.info(f"🔐 Token store: SQLite at {TOKEN_STORE_PATH}")
+        return CachedTokenStore(SQLiteTokenStore())
+    raise ValueError(f"Unknown TOKEN_STORE_BACKEND '{backend}' (expected 'sqlite' or 'memory')")
+
+
+token_store = create_token_store()
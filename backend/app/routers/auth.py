@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import RedirectResponse, JSONResponse
 from app.config import create_flow
-from app.models.token_model import tokens_db
+from app.models.token_model import token_store
+from app.services.store_manager import store_manager
 import logging
 
 router = APIRouter()
@@ -44,24 +45,55 @@ def callback(request: Request):
     credentials = flow.credentials
     logger.info("✅ Token successfully fetched from Google")
 
-    tokens_db["user"] = {
-        "token": credentials.token,
-        "refresh_token": credentials.refresh_token,
-        "id_token": credentials.id_token,
-    }
-    logger.info(f"🔒 Tokens saved in tokens_db: {list(tokens_db['user'].keys())}")
-
     session = flow.authorized_session()
     user_info = session.get("https://www.googleapis.com/oauth2/v2/userinfo").json()
-    tokens_db["user_info"] = user_info
     logger.info(f"👤 User info: {user_info}")
+    user_id = user_info.get("id")
+    if not user_id:
+        logger.warning("⚠️ Google user info has no id")
+        return JSONResponse({"error": "Could not identify Google user"}, status_code=400)
 
+    # Keyed by Google user id → concurrent users never overwrite each other
+    token_store.set(user_id, {
+        "token": credentials.token,
+        "refresh_token": credentials.refresh_token,
+        "id_token": credentials.id_token,
+        "expiry": credentials.expiry.isoformat() if credentials.expiry else None,
+        "user_info": user_info,
+    })
+    logger.info(f"🔒 Tokens saved for user {user_id}")
+    # Load their collection + BM25 index now, not on their first query
+    store_manager.warm_owner_in_background(user_id)
+
+    request.session["user_id"] = user_id
     request.session["user"] = user_info
     logger.info("🎯 Redirecting user to frontend dashboard")
 
     return RedirectResponse(url="https://docu-mind-two.vercel.app/dashboard")
 
 
+# -------------------------
+# Current user (dependency for routes that call Google APIs)
+# -------------------------
+def current_user_key(request: Request) -> str:
+    user_id = request.session.get("user_id")
+    if not user_id or user_id not in token_store:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    return user_id
+
+
+# -------------------------
+# Logout
+# -------------------------
+@router.post("/logout")
+def logout(request: Request):
+    user_id = request.session.get("user_id")
+    if user_id:
+        token_store.delete(user_id)
+    request.session.clear()
+    return {"logged_out": True}
+
+
 # -------------------------
 # Me route
 # -------------------------
@@ -1,7 +1,9 @@
-from fastapi import APIRouter
-from typing import List
-from app.services.google_service import list_docs, get_doc_content
-from app.workflows.process_docs import process_user_docs, process_single_doc
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from app.services.google_service import list_docs_page, get_doc_content
+from app.workflows.ingest_jobs import job_manager
+from app.services.chunking import chunking_stats
+from app.routers.auth import current_user_key
 
 router = APIRouter()
 
@@ -9,44 +11,84 @@ router = APIRouter()
 # List Google Docs
 # --------------------------
 @router.get("/docx")
-def get_docs():
-    files = list_docs()
-    if not files:
-        return {"error": "User not authenticated"}
-    return {"docs": files}
+def get_docs(
+    cursor: Optional[str] = None,
+    page_size: int = 100,
+    user_key: str = Depends(current_user_key)
+):
+    """
+    Cursor-paginated Drive listing: pass back `next_cursor` to get the next
+    page; it is null on the last page.
+    """
+    page = list_docs_page(user_key, page_size=page_size, page_token=cursor)
+    if page is None:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    files, next_cursor = page
+    return {"docs": files, "next_cursor": next_cursor}
 
 # --------------------------
 # Get content of a single doc
 # --------------------------
 @router.get("/docs/{doc_id}")
-def get_doc(doc_id: str):
-    content = get_doc_content(doc_id)
+def get_doc(doc_id: str, user_key: str = Depends(current_user_key)):
+    content = get_doc_content(doc_id, user_key)
     if not content:
         return {"error": "User not authenticated"}
     return {"doc_id": doc_id, "content": content}
 
 # --------------------------
-# Process multiple selected docs
+# Process multiple selected docs (background job)
 # --------------------------
-@router.post("/process_docs")
-def process_docs_route(selected_doc_ids: List[str]):
+@router.post("/process_docs", status_code=202)
+def process_docs_route(selected_doc_ids: List[str], user_key: str = Depends(current_user_key)):
     """
     selected_doc_ids: List of Google Doc IDs from frontend
     Only these docs will be embedded into Chroma DB.
+    Returns a job id right away; poll /jobs/{job_id} for progress.
     """
-    processed_docs = process_user_docs(selected_doc_ids)
+    job_id = job_manager.submit(user_key, selected_doc_ids, kind="docs")
     return {
-        "message": "Selected docs processed and stored in Chroma ✅",
-        "processed_docs": processed_docs
+        "message": "Ingestion job queued ⏳",
+        "job_id": job_id,
+        "status": "queued"
     }
 
 # --------------------------
-# Process single doc
+# Process single doc (background job)
 # --------------------------
-@router.post("/process_doc/{doc_id}")
-def process_doc_route(doc_id: str):
-    result = process_single_doc(doc_id)
+@router.post("/process_doc/{doc_id}", status_code=202)
+def process_doc_route(doc_id: str, user_key: str = Depends(current_user_key)):
+    job_id = job_manager.submit(user_key, [doc_id], kind="doc")
     return {
-        "message": f"Doc {doc_id} processed",
-        "result": result
+        "message": f"Doc {doc_id} queued ⏳",
+        "job_id": job_id,
+        "status": "queued"
     }
+
+# --------------------------
+# Ingestion jobs: status / progress / cancel
+# --------------------------
+@router.get("/jobs")
+def list_jobs(limit: int = 20, user_key: str = Depends(current_user_key)):
+    return {"jobs": job_manager.list(user_key, limit)}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, user_key: str = Depends(current_user_key)):
+    job = job_manager.get(job_id, user_key)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, user_key: str = Depends(current_user_key)):
+    job = job_manager.cancel(job_id, user_key)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --------------------------
+# Chunking stats (per strategy)
+# --------------------------
+@router.get("/chunking_stats")
+def get_chunking_stats():
+    return {"strategies": chunking_stats()}
@@ -0,0 +1,33 @@
+# app/routers/health.py
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.health import health_monitor
+
+router = APIRouter()
+
+# All handlers are `async def` and only read the monitor's cached state:
+# no threadpool hop, no I/O, so probes answer in microseconds.
+
+# --------------------------
+# Liveness (process is up and serving)
+# --------------------------
+@router.get("/live")
+async def live():
+    return health_monitor.liveness()
+
+# --------------------------
+# Readiness (critical background probes succeeded recently)
+# --------------------------
+@router.get("/ready")
+async def ready():
+    is_ready, body = health_monitor.readiness()
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+# --------------------------
+# Full status: last results, last-success timestamps, latency history
+# --------------------------
+@router.get("")
+async def status(history: bool = False):
+    return health_monitor.snapshot(include_history=history)
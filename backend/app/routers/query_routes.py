@@ -1,22 +1,33 @@
 # app/routers/query_routes.py
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+import os
+import json
 import logging
 
 # Runnable-style query function
-from app.workflows.query_docs import ask_doc_runnable, health_check
+from app.workflows.query_docs import ask_doc, ask_docs_batch, iter_docs_batch, stream_doc_answer
+from app.services.embedding_service import get_embedding_stats
+from app.services.hf_client import HF_TOKEN, UpstreamError, get_hf_client_stats
+from app.services.answer_cache import answer_cache
+from app.services.health import health_monitor
+from app.routers.auth import current_user_key
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+BATCH_QUERY_MAX_QUESTIONS = int(os.getenv("BATCH_QUERY_MAX_QUESTIONS", "100"))
+
 # -----------------------------
 # Request/Response Models
 # -----------------------------
 class QueryRequest(BaseModel):
     question: str
     selected_doc_ids: Optional[List[str]] = None
+    retrieval_mode: Optional[Literal["vector", "lexical", "hybrid"]] = None  # default: RETRIEVAL_MODE
 
 class QueryResponse(BaseModel):
     question: str
@@ -24,6 +35,25 @@ class QueryResponse(BaseModel):
     sources: List[str]
     status: str = "success"
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=BATCH_QUERY_MAX_QUESTIONS)
+    selected_doc_ids: Optional[List[str]] = None
+    retrieval_mode: Optional[Literal["vector", "lexical", "hybrid"]] = None
+    max_concurrency: Optional[int] = Field(None, ge=1, le=32)  # default: BATCH_MAX_CONCURRENCY
+
+class BatchAnswer(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    sources: List[str]
+    cached: bool = False
+    status: str = "success"
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchAnswer]
+    status: str = "success"
+
 class HealthResponse(BaseModel):
     llm_api: bool
     embedding_api: bool
@@ -34,13 +64,15 @@ class HealthResponse(BaseModel):
 # Query endpoint
 # -----------------------------
 @router.post("/query_docs", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
+async def query_documents(request: QueryRequest, user_key: str = Depends(current_user_key)):
     try:
-        answer, sources = ask_doc_runnable(
+        answer, sources = await ask_doc(
             question=request.question.strip(),
-            selected_doc_ids=request.selected_doc_ids
+            selected_doc_ids=request.selected_doc_ids,
+            retrieval_mode=request.retrieval_mode,
+            owner=user_key
         )
-        # AIMessage handling done inside ask_doc_runnable
+        # AIMessage handling done inside ask_doc
         status = "success" if answer and not str(answer).startswith("Error:") else "partial_error"
         return QueryResponse(
             question=request.question,
@@ -48,67 +80,205 @@ async def query_documents(request: QueryRequest):
             sources=sources,
             status=status
         )
+    except UpstreamError as e:
+        # Retries exhausted or circuit open: tell the client when to come back
+        logger.error(f"Model endpoint unavailable: {e}")
+        retry_after = max(1, round(e.retry_after or 0))
+        raise HTTPException(
+            status_code=503,
+            detail="Model endpoint is unavailable, please retry shortly",
+            headers={"Retry-After": str(retry_after)}
+        )
     except Exception as e:
         logger.exception(f"Query error: {e}")
         raise HTTPException(status_code=500, detail="Failed to process query")
 
 # -----------------------------
-# Health check
+# Streaming query endpoint (Server-Sent Events)
 # -----------------------------
-@router.get("/health", response_model=HealthResponse)
-async def check_health():
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/query_docs/stream")
+def query_documents_stream(request: QueryRequest, user_key: str = Depends(current_user_key)):
+    """
+    Emits `sources` first, then one `token` event per generated chunk and a
+    final `done` event carrying ttfb/retrieval/total timings.
+    """
+    def event_stream():
+        try:
+            for event, data in stream_doc_answer(
+                question=request.question.strip(),
+                selected_doc_ids=request.selected_doc_ids,
+                retrieval_mode=request.retrieval_mode,
+                owner=user_key
+            ):
+                yield _sse(event, data)
+        except UpstreamError as e:
+            logger.error(f"Model endpoint unavailable: {e}")
+            yield _sse("error", {"detail": "Model endpoint is unavailable, please retry shortly", "retry_after": e.retry_after})
+        except Exception as e:
+            logger.exception(f"Streaming query error: {e}")
+            yield _sse("error", {"detail": "Failed to process query"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# -----------------------------
+# Batch query endpoints (shared embedding + retrieval, capped parallel generation)
+# -----------------------------
+def _batch_answer(result: dict) -> BatchAnswer:
+    return BatchAnswer(**result, status="error" if result.get("error") else "success")
+
+
+def _batch_kwargs(request: BatchQueryRequest, user_key: str) -> dict:
+    return dict(
+        selected_doc_ids=request.selected_doc_ids,
+        retrieval_mode=request.retrieval_mode,
+        owner=user_key,
+        max_concurrency=request.max_concurrency
+    )
+
+
+@router.post("/query_docs/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(request: BatchQueryRequest, user_key: str = Depends(current_user_key)):
+    """Answers in request order; a failed question is marked on its own result."""
     try:
-        health = health_check()
-        return HealthResponse(
-            llm_api=health.get("llm_api", False),
-            embedding_api=health.get("embedding_api", False),
-            vectordb=health.get("vectordb", False),
-            hf_token=health.get("hf_token", False)
+        results = [_batch_answer(r) for r in await ask_docs_batch(request.questions, **_batch_kwargs(request, user_key))]
+    except UpstreamError as e:
+        logger.error(f"Model endpoint unavailable: {e}")
+        retry_after = max(1, round(e.retry_after or 0))
+        raise HTTPException(
+            status_code=503,
+            detail="Model endpoint is unavailable, please retry shortly",
+            headers={"Retry-After": str(retry_after)}
         )
     except Exception as e:
-        logger.exception(f"Health check failed: {e}")
-        raise HTTPException(status_code=500, detail="Health check failed")
+        logger.exception(f"Batch query error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to process batch query")
+    failed = sum(r.status == "error" for r in results)
+    status = "success" if not failed else "error" if failed == len(results) else "partial_error"
+    return BatchQueryResponse(results=results, status=status)
+
+
+@router.post("/query_docs/batch/stream")
+async def query_documents_batch_stream(request: BatchQueryRequest, user_key: str = Depends(current_user_key)):
+    """
+    NDJSON: one line per question as soon as it is answered (use `index` to
+    place it), then a final `{"done": true}` line.
+    """
+    async def result_stream():
+        try:
+            async for result in iter_docs_batch(request.questions, **_batch_kwargs(request, user_key)):
+                yield _batch_answer(result).model_dump_json() + "\n"
+        except UpstreamError as e:
+            logger.error(f"Model endpoint unavailable: {e}")
+            yield json.dumps({"error": "Model endpoint is unavailable, please retry shortly", "retry_after": e.retry_after}) + "\n"
+        except Exception as e:
+            logger.exception(f"Streaming batch query error: {e}")
+            yield json.dumps({"error": "Failed to process batch query"}) + "\n"
+        yield json.dumps({"done": True}) + "\n"
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# -----------------------------
+# Health check (cached background probe results; see /health)
+# -----------------------------
+def _probe_ok(name: str) -> bool:
+    state = health_monitor.probe(name)
+    return bool(state is not None and state.ok)
+
+
+@router.get("/health", response_model=HealthResponse)
+async def check_health():
+    return HealthResponse(
+        llm_api=_probe_ok("llm"),
+        embedding_api=_probe_ok("embeddings"),
+        vectordb=_probe_ok("vectordb"),
+        hf_token=bool(HF_TOKEN)
+    )
+
+# -----------------------------
+# Embedding batcher + cache stats
+# -----------------------------
+@router.get("/embedding_stats")
+def embedding_stats():
+    return get_embedding_stats()
+
+# -----------------------------
+# HF client stats (retries, hedges, circuit state per endpoint)
+# -----------------------------
+@router.get("/hf_client_stats")
+def hf_client_stats():
+    return get_hf_client_stats()
+
+# -----------------------------
+# Answer cache stats
+# -----------------------------
+@router.get("/answer_cache_stats")
+def answer_cache_stats():
+    return answer_cache.stats()
 
 # -----------------------------
 # Optional: Google Docs processing endpoints
 # -----------------------------
-from app.services.google_service import list_docs, get_doc_content
-from app.workflows.process_docs import process_user_docs, process_single_doc
+from app.services.google_service import list_docs_page, get_doc_content
+from app.workflows.ingest_jobs import job_manager
 
 # List Google Docs
 @router.get("/docx")
-def get_docs():
-    files = list_docs()
-    if not files:
-        return {"error": "User not authenticated or no docs found"}
-    return {"docs": files}
+def get_docs(
+    cursor: Optional[str] = None,
+    page_size: int = 100,
+    user_key: str = Depends(current_user_key)
+):
+    """
+    Cursor-paginated Drive listing: pass back `next_cursor` to get the next
+    page; it is null on the last page.
+    """
+    page = list_docs_page(user_key, page_size=page_size, page_token=cursor)
+    if page is None:
+        raise HTTPException(status_code=401, detail="User not authenticated")
+    files, next_cursor = page
+    return {"docs": files, "next_cursor": next_cursor}
 
 # Get content of a single doc
 @router.get("/docs/{doc_id}")
-def get_doc(doc_id: str):
-    content = get_doc_content(doc_id)
+def get_doc(doc_id: str, user_key: str = Depends(current_user_key)):
+    content = get_doc_content(doc_id, user_key)
     if not content:
         return {"error": "Document not found or empty"}
     return {"doc_id": doc_id, "content": content}
 
 # Process multiple selected docs
-@router.post("/process_docs")
-def process_docs_route(selected_doc_ids: List[str]):
+@router.post("/process_docs", status_code=202)
+def process_docs_route(selected_doc_ids: List[str], user_key: str = Depends(current_user_key)):
     """
     selected_doc_ids: List of Google Doc IDs from frontend
     Only these docs will be embedded into Chroma DB.
+    Runs as a background job; poll /documents/jobs/{job_id}.
     """
-    processed_docs = process_user_docs(selected_doc_ids)
+    job_id = job_manager.submit(user_key, selected_doc_ids, kind="docs")
     return {
-        "message": "Selected docs processed and stored in Chroma ✅",
-        "processed_docs": processed_docs
+        "message": "Ingestion job queued ⏳",
+        "job_id": job_id,
+        "status": "queued"
     }
 
 # Process single doc
-@router.post("/process_doc/{doc_id}")
-def process_doc_route(doc_id: str):
-    result = process_single_doc(doc_id)
+@router.post("/process_doc/{doc_id}", status_code=202)
+def process_doc_route(doc_id: str, user_key: str = Depends(current_user_key)):
+    job_id = job_manager.submit(user_key, [doc_id], kind="doc")
     return {
-        "message": f"Doc {doc_id} processed",
-        "result": result
+        "message": f"Doc {doc_id} queued ⏳",
+        "job_id": job_id,
+        "status": "queued"
     }
@@ -0,0 +1,241 @@
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.partitions import DEFAULT_OWNER
+from app.services.metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+# Near-duplicate matching, off by default: MiniLM scores questions that differ
+# only in an identifier ("error 1042" / "error 1043") above 0.95
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def _unit(embedding: List[float]) -> Optional[np.ndarray]:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else None
+
+
+@dataclass
+class _Entry:
+    answer: str
+    sources: List[str]
+    doc_ids: Optional[FrozenSet[str]]  # None → question ran over the whole index
+    embedding: Optional[np.ndarray]  # unit-normalized
+    created: float
+
+
+class _Group:
+    """Embeddings of the entries sharing (owner, docs, version), stacked on demand for one matmul."""
+
+    def __init__(self):
+        self.vectors: Dict[Tuple, np.ndarray] = {}
+        self._keys: List[Tuple] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> Tuple[List[Tuple], np.ndarray]:
+        if self._matrix is None:
+            self._keys = list(self.vectors)
+            self._matrix = np.stack([self.vectors[k] for k in self._keys])
+        return self._keys, self._matrix
+
+    def add(self, key: Tuple, vector: np.ndarray):
+        self.vectors[key] = vector
+        self._matrix = None
+
+    def discard(self, key: Tuple):
+        if self.vectors.pop(key, None) is not None:
+            self._matrix = None
+
+
+# -----------------------------
+# Answer cache
+# -----------------------------
+class AnswerCache:
+    """
+    LRU + TTL cache of (answer, sources) keyed by
+    (normalized question, owner, sorted selected_doc_ids, index version).
+
+    Optionally falls back to a near-duplicate match: a cached question over
+    the same doc selection whose embedding is within `similarity` cosine
+    (one matrix product over that selection's entries).
+    Re-indexing a doc drops every entry of its owner that could have read it.
+    Callers should try get_exact first and only embed the question on a miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.similarity = similarity
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._groups: Dict[Tuple, _Group] = {}  # key[1:] → embeddings, near-duplicate lookups only
+        self._lock = threading.Lock()
+        # Index version, per owner: per-doc generations for selected-doc
+        # questions, an index generation for whole-index questions
+        self._doc_generation: Dict[Tuple[str, str], int] = {}
+        self._index_version: Dict[str, int] = {}
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _key(self, question: str, selected_doc_ids: Optional[List[str]], owner: str) -> Tuple:
+        if selected_doc_ids:
+            docs_key = tuple(sorted(set(selected_doc_ids)))
+            version = tuple(self._doc_generation.get((owner, d), 0) for d in docs_key)
+        else:
+            docs_key, version = (), self._index_version.get(owner, 0)
+        return normalize_question(question), owner, docs_key, version
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl > 0 and now - entry.created > self.ttl
+
+    def _remove(self, key: Tuple):
+        self._entries.pop(key, None)
+        group = self._groups.get(key[1:])
+        if group is not None:
+            group.discard(key)
+            if not group.vectors:
+                del self._groups[key[1:]]
+
+    def _nearest(self, key: Tuple, embedding: List[float], now: float) -> Optional[Tuple]:
+        group = self._groups.get(key[1:])
+        query = _unit(embedding)
+        if group is None or query is None:
+            return None
+        keys, matrix = group.matrix()
+        if matrix.shape[1] != query.shape[0]:
+            return None  # embedding model changed
+        scores = matrix @ query
+        for i in np.argsort(-scores):
+            if scores[i] < self.similarity:
+                return None
+            entry = self._entries.get(keys[i])
+            if entry is not None and not self._expired(entry, now):
+                return keys[i]
+        return None
+
+    def _exact(self, key: Tuple, now: float) -> Optional[Tuple[str, List[str]]]:
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry, now):
+            self._remove(key)
+            entry = None
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        count_cache("answer", True)
+        return entry.answer, entry.sources
+
+    def get_exact(
+        self,
+        question: str,
+        selected_doc_ids: Optional[List[str]] = None,
+        owner: str = DEFAULT_OWNER,
+    ) -> Optional[Tuple[str, List[str]]]:
+        """Exact-key lookup, no embedding needed; a miss is only counted by get()."""
+        with self._lock:
+            return self._exact(self._key(question, selected_doc_ids, owner), time.time())
+
+    def get(
+        self,
+        question: str,
+        selected_doc_ids: Optional[List[str]] = None,
+        embedding: Optional[List[float]] = None,
+        owner: str = DEFAULT_OWNER,
+    ) -> Optional[Tuple[str, List[str]]]:
+        now = time.time()
+        with self._lock:
+            key = self._key(question, selected_doc_ids, owner)
+            cached = self._exact(key, now)
+            if cached is not None:
+                return cached
+
+            if embedding is not None and self.similarity > 0:
+                best_key = self._nearest(key, embedding, now)
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    self.semantic_hits += 1
+                    count_cache("answer_semantic", True)
+                    e = self._entries[best_key]
+                    return e.answer, e.sources
+
+            self.misses += 1
+            count_cache("answer", False)
+            return None
+
+    def put(
+        self,
+        question: str,
+        selected_doc_ids: Optional[List[str]],
+        answer: str,
+        sources: List[str],
+        embedding: Optional[List[float]] = None,
+        owner: str = DEFAULT_OWNER,
+    ):
+        with self._lock:
+            key = self._key(question, selected_doc_ids, owner)
+            self._remove(key)
+            vector = _unit(embedding) if embedding is not None and self.similarity > 0 else None
+            self._entries[key] = _Entry(
+                answer=answer,
+                sources=sources,
+                doc_ids=frozenset(selected_doc_ids) if selected_doc_ids else None,
+                embedding=vector,
+                created=time.time(),
+            )
+            if vector is not None:
+                self._groups.setdefault(key[1:], _Group()).add(key, vector)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_docs(self, doc_ids: List[str], owner: str = DEFAULT_OWNER):
+        """Drop `owner`'s entries whose answer may depend on any of `doc_ids`."""
+        changed = set(doc_ids)
+        with self._lock:
+            self._index_version[owner] = self._index_version.get(owner, 0) + 1
+            for doc_id in changed:
+                self._doc_generation[(owner, doc_id)] = self._doc_generation.get((owner, doc_id), 0) + 1
+            stale = [
+                k for k, e in self._entries.items()
+                if k[1] == owner and (e.doc_ids is None or e.doc_ids & changed)
+            ]
+            for k in stale:
+                self._remove(k)
+            self.invalidations += len(stale)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+                "index_version": sum(self._index_version.values()),  # invalidation rounds, all owners
+            }
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,206 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.services.doc_parser import ParsedDoc
+from app.services.embedding_service import embedding_model_key
+from app.services.metrics import count_chunks, observe_stage
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_TOKENIZER_PATH = os.getenv("EMBEDDING_TOKENIZER_PATH")  # local tokenizer.json (offline)
+LOCAL_EMBEDDING_MODEL_DIR = os.getenv("LOCAL_EMBEDDING_MODEL_DIR", "./models/all-MiniLM-L6-v2")
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "fixed")
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "128"))  # MiniLM truncates at 256
+SENTENCE_WINDOW = int(os.getenv("CHUNK_SENTENCE_WINDOW", "3"))
+
+STRATEGIES = ("fixed", "heading", "sentence", "token")
+
+
+@dataclass
+class Chunk:
+    text: str
+    start: int  # character offsets into the source text
+    end: int
+    heading_path: List[str] = field(default_factory=list)
+    token_count: int = 0
+    index: int = 0
+
+
+# -----------------------------
+# Token counting (embedding model tokenizer, lazy-loaded)
+# -----------------------------
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """HF `tokenizers` tokenizer for the embedding model, or None if unavailable."""
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            _tokenizer_loaded = True
+            try:
+                from tokenizers import Tokenizer
+                local_path = os.path.join(LOCAL_EMBEDDING_MODEL_DIR, "tokenizer.json")
+                if EMBEDDING_TOKENIZER_PATH:
+                    _tokenizer = Tokenizer.from_file(EMBEDDING_TOKENIZER_PATH)
+                elif os.path.exists(local_path):
+                    _tokenizer = Tokenizer.from_file(local_path)
+                else:
+                    _tokenizer = Tokenizer.from_pretrained(EMBEDDING_MODEL)
+                logger.info(f"🔤 Tokenizer loaded for '{EMBEDDING_MODEL}'")
+            except Exception as e:
+                logger.warning(f"⚠️ Tokenizer unavailable, using word-count estimate: {e}")
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return int(len(text.split()) * 1.3) + 1
+
+
+# -----------------------------
+# Strategies
+# -----------------------------
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|\n+|$)")
+
+
+def _locate(text: str, pieces: List[str], base: int = 0) -> List[Chunk]:
+    """Turn split pieces into Chunks with offsets, scanning forward once."""
+    chunks, cursor = [], 0
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        pos = text.find(piece, cursor)
+        if pos < 0:
+            pos = text.find(piece)
+        pos = max(pos, 0)
+        chunks.append(Chunk(text=piece, start=base + pos, end=base + pos + len(piece)))
+        # Next piece overlaps this one, so it starts somewhere after `pos`
+        cursor = pos + 1
+    return chunks
+
+
+def _fixed(text: str, base: int = 0) -> List[Chunk]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return _locate(text, splitter.split_text(text), base)
+
+
+def _token_budget(text: str, base: int = 0) -> List[Chunk]:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_TOKEN_BUDGET,
+        chunk_overlap=max(CHUNK_TOKEN_BUDGET // 8, 0),
+        length_function=count_tokens,
+    )
+    return _locate(text, splitter.split_text(text), base)
+
+
+def _sentence_window(text: str, base: int = 0) -> List[Chunk]:
+    """Windows of SENTENCE_WINDOW sentences, sliding by one less (1-sentence overlap)."""
+    sentences = [(m.start(), m.end()) for m in _SENTENCE_RE.finditer(text) if m.group().strip()]
+    if not sentences:
+        return []
+    step = max(SENTENCE_WINDOW - 1, 1)
+    chunks = []
+    for i in range(0, len(sentences), step):
+        window = sentences[i:i + SENTENCE_WINDOW]
+        raw = text[window[0][0]:window[-1][1]]
+        start = window[0][0] + len(raw) - len(raw.lstrip())
+        piece = raw.strip()
+        chunks.append(Chunk(text=piece, start=base + start, end=base + start + len(piece)))
+        if i + SENTENCE_WINDOW >= len(sentences):
+            break
+    return chunks
+
+
+def _heading_aware(doc: ParsedDoc) -> List[Chunk]:
+    """Never let a chunk straddle two sections; each chunk carries its section's heading path."""
+    chunks = []
+    for section in doc.sections:
+        for chunk in _fixed(doc.text[section.start:section.end], base=section.start):
+            chunk.heading_path = list(section.heading_path)
+            chunks.append(chunk)
+    return chunks
+
+
+# -----------------------------
+# Public API
+# -----------------------------
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+def chunk_document(doc: Union[str, ParsedDoc], strategy: Optional[str] = None) -> List[Chunk]:
+    """
+    Split a document once into Chunks carrying offsets, heading path and
+    embedding-token count. `doc` may be raw text or a ParsedDoc.
+    """
+    strategy = strategy or CHUNK_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy '{strategy}' (expected one of {STRATEGIES})")
+    parsed = doc if isinstance(doc, ParsedDoc) else ParsedDoc(text=doc)
+    started = time.perf_counter()
+
+    if strategy == "heading" and parsed.sections:
+        chunks = _heading_aware(parsed)
+    elif strategy == "sentence":
+        chunks = _sentence_window(parsed.text)
+    elif strategy == "token":
+        chunks = _token_budget(parsed.text)
+    else:
+        chunks = _fixed(parsed.text)
+
+    for i, chunk in enumerate(chunks):
+        chunk.index = i
+        chunk.token_count = count_tokens(chunk.text)
+        if not chunk.heading_path and parsed.sections:
+            section = parsed.section_at(chunk.start)
+            if section is not None:
+                chunk.heading_path = list(section.heading_path)
+
+    elapsed = time.perf_counter() - started
+    observe_stage("chunk", elapsed)
+    count_chunks("created", len(chunks))
+    with _stats_lock:
+        s = _stats.setdefault(strategy, {"docs": 0, "chunks": 0, "chars": 0, "tokens": 0, "seconds": 0.0})
+        s["docs"] += 1
+        s["chunks"] += len(chunks)
+        s["chars"] += len(parsed.text)
+        s["tokens"] += sum(c.token_count for c in chunks)
+        s["seconds"] += elapsed
+    return chunks
+
+
+def chunker_fingerprint(strategy: Optional[str] = None) -> str:
+    """Short hash of the chunking settings and embedding model; part of each doc's recorded index version."""
+    strategy = strategy or CHUNK_STRATEGY
+    settings = f"{strategy}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{CHUNK_TOKEN_BUDGET}|{SENTENCE_WINDOW}|{embedding_model_key()}"
+    return hashlib.sha1(settings.encode("utf-8")).hexdigest()[:8]
+
+
+def chunking_stats() -> Dict[str, Dict[str, float]]:
+    with _stats_lock:
+        report = {}
+        for strategy, s in _stats.items():
+            report[strategy] = {
+                **s,
+                "seconds": round(s["seconds"], 3),
+                "avg_chunks_per_doc": round(s["chunks"] / s["docs"], 2) if s["docs"] else 0.0,
+                "chunks_per_sec": round(s["chunks"] / s["seconds"], 1) if s["seconds"] else 0.0,
+                "chars_per_sec": round(s["chars"] / s["seconds"], 1) if s["seconds"] else 0.0,
+            }
+        return report
@@ -0,0 +1,180 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.services.chunking import CHUNK_OVERLAP, count_tokens
+from app.services.reranker import get_reranker
+from app.services.metrics import count_tokens_used, observe_stage
+
+logger = logging.getLogger(__name__)
+
+HF_MODEL = os.getenv("HF_MODEL", "openai/gpt-oss-120b")
+CONTEXT_TOKENIZER_PATH = os.getenv("CONTEXT_TOKENIZER_PATH")  # local tokenizer.json for HF_MODEL
+# ≈ the previous fixed context (top 3 chunks × 200 chars)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "150"))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+MIN_OVERLAP_CHARS = 16
+
+
+# -----------------------------
+# LLM token counting (HF_MODEL tokenizer, loaded at warm-up)
+# -----------------------------
+_llm_tokenizer = None
+_llm_tokenizer_loaded = False
+_llm_tokenizer_loading = False
+_llm_tokenizer_lock = threading.Lock()
+
+
+def get_llm_tokenizer():
+    """HF `tokenizers` tokenizer for HF_MODEL, or None if unavailable (may download: warm-up only)."""
+    global _llm_tokenizer, _llm_tokenizer_loaded
+    with _llm_tokenizer_lock:
+        if not _llm_tokenizer_loaded:
+            _llm_tokenizer_loaded = True
+            try:
+                from tokenizers import Tokenizer
+                if CONTEXT_TOKENIZER_PATH:
+                    _llm_tokenizer = Tokenizer.from_file(CONTEXT_TOKENIZER_PATH)
+                else:
+                    _llm_tokenizer = Tokenizer.from_pretrained(HF_MODEL)
+                logger.info(f"🔤 Context tokenizer loaded for '{HF_MODEL}'")
+            except Exception as e:
+                logger.warning(f"⚠️ No tokenizer for '{HF_MODEL}', using the embedding tokenizer: {e}")
+    return _llm_tokenizer
+
+
+def _loaded_llm_tokenizer():
+    """Never blocks a request on the Hub: until the tokenizer is loaded, load it in the background."""
+    global _llm_tokenizer_loading
+    if not _llm_tokenizer_loaded and not _llm_tokenizer_loading:
+        with _llm_tokenizer_lock:
+            if _llm_tokenizer_loading:
+                return _llm_tokenizer
+            _llm_tokenizer_loading = True
+        threading.Thread(target=get_llm_tokenizer, name="llm-tokenizer", daemon=True).start()
+    return _llm_tokenizer
+
+
+def count_llm_tokens(text: str) -> int:
+    tokenizer = _loaded_llm_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return count_tokens(text)
+
+
+# -----------------------------
+# Stages: rerank → dedupe overlaps → pack
+# -----------------------------
+def rerank(question: str, docs: List[Document]) -> List[Document]:
+    reranker = get_reranker()
+    if reranker is None or len(docs) < 2:
+        return docs
+    scores = reranker.score(question, [d.page_content for d in docs])
+    for doc, score in zip(docs, scores):
+        doc.metadata["rerank_score"] = round(float(score), 4)
+    return [doc for _, doc in sorted(zip(scores, docs), key=lambda pair: pair[0], reverse=True)]
+
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b` (splitter overlap)."""
+    longest = min(len(a), len(b), CHUNK_OVERLAP * 2)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if a.endswith(b[:size]):
+            return size
+    return 0
+
+
+def dedupe_overlaps(docs: List[Document]) -> Tuple[List[Document], int]:
+    """
+    Drop chunks already contained in a higher-ranked chunk of the same doc and
+    trim the overlap neighbouring chunks share. Returns (docs, chars removed).
+    """
+    kept: List[Document] = []
+    removed = 0
+    for doc in docs:
+        text = doc.page_content
+        doc_id = doc.metadata.get("doc_id")
+        for other in kept:
+            if other.metadata.get("doc_id") != doc_id:
+                continue
+            if text in other.page_content:
+                removed += len(text)
+                text = ""
+                break
+            head = _overlap(other.page_content, text)
+            if head:
+                removed += head
+                text = text[head:]
+            tail = _overlap(text, other.page_content)
+            if tail:
+                removed += tail
+                text = text[:-tail]
+        if text.strip():
+            kept.append(Document(page_content=text, metadata=doc.metadata))
+    return kept, removed
+
+
+def pack(
+    docs: List[Document],
+    budget: int,
+    max_chunks_per_doc: Optional[int] = None,
+    max_chunk_length: Optional[int] = None
+) -> Tuple[List[Document], int]:
+    """Greedily take chunks in rank order while they fit the token budget. Returns (docs, tokens used)."""
+    packed, used, per_doc = [], 0, {}
+    for doc in docs:
+        doc_id = doc.metadata.get("doc_id")
+        if max_chunks_per_doc and per_doc.get(doc_id, 0) >= max_chunks_per_doc:
+            continue
+        text = doc.page_content
+        if max_chunk_length and len(text) > max_chunk_length:
+            text = text[:max_chunk_length] + "..."
+        tokens = count_llm_tokens(text)
+        if used + tokens > budget:
+            continue  # a smaller, lower-ranked chunk may still fit
+        packed.append(Document(page_content=text, metadata=doc.metadata))
+        used += tokens
+        per_doc[doc_id] = per_doc.get(doc_id, 0) + 1
+    return packed, used
+
+
+def build_context(
+    question: str,
+    candidates: List[Document],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    max_chunks_per_doc: Optional[int] = None,
+    max_chunk_length: Optional[int] = None
+) -> Tuple[List[Document], Dict[str, float]]:
+    """
+    Turn over-fetched candidates into the chunks sent to the LLM.
+    Returns (packed docs, stats incl. tokens saved vs. sending every candidate).
+    """
+    started = time.perf_counter()
+    ranked = rerank(question, candidates)
+    rerank_s = time.perf_counter() - started
+
+    deduped, overlap_chars = dedupe_overlaps(ranked)
+    packed, context_tokens = pack(deduped, budget, max_chunks_per_doc, max_chunk_length)
+
+    candidate_tokens = sum(count_llm_tokens(d.page_content) for d in candidates)
+    stats = {
+        "candidates": len(candidates),
+        "reranked": get_reranker() is not None,
+        "after_dedupe": len(deduped),
+        "packed": len(packed),
+        "overlap_chars_removed": overlap_chars,
+        "candidate_tokens": candidate_tokens,
+        "context_tokens": context_tokens,
+        "tokens_saved": candidate_tokens - context_tokens,
+        "rerank_ms": round(rerank_s * 1000, 1),
+        "context_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    observe_stage("rerank", rerank_s)
+    observe_stage("prompt_build", time.perf_counter() - started - rerank_s)
+    count_tokens_used("context", context_tokens)
+    logger.info(f"📦 Context packed: {stats}")
+    return packed, stats
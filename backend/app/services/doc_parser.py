@@ -0,0 +1,137 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+# -----------------------------
+# Google Docs JSON → text + sections
+# -----------------------------
+HEADING_LEVELS = {
+    "TITLE": 0,
+    "HEADING_1": 1,
+    "HEADING_2": 2,
+    "HEADING_3": 3,
+    "HEADING_4": 4,
+    "HEADING_5": 5,
+    "HEADING_6": 6,
+}
+
+
+@dataclass
+class Section:
+    heading_path: List[str]
+    start: int  # character offsets into ParsedDoc.text
+    end: int
+
+
+@dataclass
+class ParsedDoc:
+    text: str
+    title: str = ""
+    sections: List[Section] = field(default_factory=list)
+    # Section start offsets, built once on the first lookup (sections are final by then)
+    _starts: Optional[List[int]] = field(default=None, init=False, repr=False, compare=False)
+
+    def section_at(self, offset: int) -> Optional[Section]:
+        if self._starts is None or len(self._starts) != len(self.sections):
+            self._starts = [s.start for s in self.sections]
+        i = bisect_right(self._starts, offset) - 1
+        if i >= 0 and offset < self.sections[i].end:
+            return self.sections[i]
+        return None
+
+
+class _Builder:
+    """Accumulates text parts with a running offset (no repeated string copies)."""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.offset = 0
+        self.headings: List[Tuple[int, str]] = []  # (level, text) stack
+        self.sections: List[Section] = []
+        self.section_start = 0
+        self.title = ""
+
+    def write(self, text: str):
+        if text:
+            self.parts.append(text)
+            self.offset += len(text)
+
+    def close_section(self):
+        if self.offset > self.section_start:
+            self.sections.append(Section(
+                heading_path=[h for _, h in self.headings],
+                start=self.section_start,
+                end=self.offset,
+            ))
+        self.section_start = self.offset
+
+    def heading(self, level: int, text: str):
+        self.close_section()
+        while self.headings and self.headings[-1][0] >= level:
+            self.headings.pop()
+        self.headings.append((level, text))
+        if level == 0 and not self.title:
+            self.title = text
+
+
+def _paragraph_text(paragraph: dict) -> str:
+    pieces = []
+    for elem in paragraph.get("elements", []):
+        if "textRun" in elem:
+            pieces.append(elem["textRun"].get("content", ""))
+        elif "richLink" in elem:
+            pieces.append(elem["richLink"].get("richLinkProperties", {}).get("title", ""))
+        elif "person" in elem:
+            props = elem["person"].get("personProperties", {})
+            pieces.append(props.get("name") or props.get("email", ""))
+    return "".join(pieces)
+
+
+def _walk(content: List[dict], out: _Builder, include_toc: bool, in_table: bool = False):
+    for element in content:
+        if "paragraph" in element:
+            paragraph = element["paragraph"]
+            text = _paragraph_text(paragraph)
+            style = paragraph.get("paragraphStyle", {}).get("namedStyleType", "NORMAL_TEXT")
+            level = HEADING_LEVELS.get(style)
+            if level is not None and not in_table and text.strip():
+                out.heading(level, text.strip())
+            bullet = paragraph.get("bullet")
+            if bullet is not None and text.strip():
+                out.write("  " * bullet.get("nestingLevel", 0) + "- ")
+            out.write(text)
+
+        elif "table" in element:
+            for row in element["table"].get("tableRows", []):
+                for i, cell in enumerate(row.get("tableCells", [])):
+                    if i:
+                        out.write(" | ")
+                    cell_out = _Builder()
+                    _walk(cell.get("content", []), cell_out, include_toc, in_table=True)
+                    out.write(" ".join("".join(cell_out.parts).split()))
+                out.write("\n")
+
+        elif "tableOfContents" in element:
+            # The TOC repeats the headings; only index it when asked to
+            if include_toc:
+                _walk(element["tableOfContents"].get("content", []), out, include_toc, in_table=True)
+
+        elif "sectionBreak" in element:
+            if out.parts and not out.parts[-1].endswith("\n"):
+                out.write("\n")
+
+
+def parse_document(doc: dict, include_toc: bool = False) -> ParsedDoc:
+    """
+    Walk the full Docs JSON tree once (paragraphs, lists, tables, TOC,
+    section breaks) and return the text with heading-path sections whose
+    offsets point into that text.
+    """
+    out = _Builder()
+    _walk(doc.get("body", {}).get("content", []), out, include_toc)
+    out.close_section()
+    return ParsedDoc(
+        text="".join(out.parts),
+        title=out.title or doc.get("title", ""),
+        sections=out.sections,
+    )
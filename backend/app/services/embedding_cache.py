@@ -0,0 +1,145 @@
+import os
+import logging
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache/embeddings.sqlite")
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+# Hits only bump last_access in memory; written back in bulk this often (approximate LRU)
+EMBEDDING_CACHE_TOUCH_FLUSH_SECONDS = float(os.getenv("EMBEDDING_CACHE_TOUCH_FLUSH_SECONDS", "30"))
+_TOUCH_FLUSH_MAX = 4096
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form used for cache keys."""
+    return " ".join(text.split())
+
+
+def cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+# -----------------------------
+# On-disk content-addressed cache
+# -----------------------------
+class EmbeddingCache:
+    """
+    SQLite-backed embedding cache keyed by (model, normalized text hash).
+    Least-recently-used rows are evicted once the stored vectors exceed
+    `max_bytes`. Reads never commit: access times are batched and written
+    with the next insert (or every EMBEDDING_CACHE_TOUCH_FLUSH_SECONDS).
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, model: str = "", max_mb: float = EMBEDDING_CACHE_MAX_MB):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.model = model
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL,"
+            " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        self._touched: Dict[str, float] = {}  # key → last_access not yet written
+        self._touch_flushed = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _select_in(self, columns: str, keys: List[str]) -> List[tuple]:
+        rows = []
+        for start in range(0, len(keys), 500):  # stay under SQLite's variable limit
+            part = keys[start:start + 500]
+            rows.extend(self._conn.execute(
+                f"SELECT {columns} FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        return rows
+
+    def get_many(self, texts: List[str]) -> Dict[int, List[float]]:
+        """Return {index: vector} for the texts that are cached."""
+        if not texts:
+            return {}
+        keys = [cache_key(self.model, t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for key, blob in self._select_in("key, vector", list(set(keys))):
+                found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._touched.update((k, now) for k in found)
+                if len(self._touched) >= _TOUCH_FLUSH_MAX or now - self._touch_flushed >= EMBEDDING_CACHE_TOUCH_FLUSH_SECONDS:
+                    self._flush_touched()
+                    self._conn.commit()
+            hits = {i: found[k] for i, k in enumerate(keys) if k in found}
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return hits
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        if not texts:
+            return
+        now = time.time()
+        by_key = {}
+        for text, vec in zip(texts, vectors):
+            blob = array("f", vec).tobytes()
+            key = cache_key(self.model, text)
+            by_key[key] = (key, blob, len(blob), now)
+        rows = list(by_key.values())
+        with self._lock:
+            existing = dict(self._select_in("key, size", list(by_key)))
+            self._flush_touched()  # rides on this commit; eviction sees current access times
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)", rows
+            )
+            self._total_bytes += sum(r[2] for r in rows) - sum(existing.values())
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touch_flushed = time.time()
+
+    def _evict(self):
+        # Trim to 90% so we don't evict on every insert once full
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_access LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", [(k,) for k, _ in rows])
+            self._total_bytes -= sum(size for _, size in rows)
+            self.evictions += len(rows)
+        logger.info(f"🧹 Embedding cache evicted down to {self._total_bytes / 1e6:.1f} MB")
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+            "size_mb": round(self._total_bytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+        }
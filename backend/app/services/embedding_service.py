@@ -0,0 +1,279 @@
+import os
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.services.embedding_cache import EmbeddingCache
+from app.services.executor import run_blocking
+from app.services.metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hf")  # "hf" (Inference API) | "local" (ONNX on CPU)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "10"))
+EMBED_MAX_INFLIGHT = int(os.getenv("EMBED_MAX_INFLIGHT", "4"))
+# Upper bound on waiting for a batch (covers queueing, HF retries and backoff)
+EMBED_RESULT_TIMEOUT_SECONDS = float(os.getenv("EMBED_RESULT_TIMEOUT_SECONDS", "300"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+
+# -----------------------------
+# Micro-batcher
+# -----------------------------
+class _Request:
+    __slots__ = ("texts", "vectors", "pending", "future", "lock")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.vectors: List[Optional[List[float]]] = [None] * len(texts)
+        self.pending = len(texts)
+        self.future: Future = Future()
+        self.lock = threading.Lock()  # a large request can span batches in flight
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce texts from concurrent callers into micro-batches.
+
+    A batch is flushed as soon as it holds `max_batch_size` texts or the
+    oldest text has waited `max_wait_ms`. Identical texts in one batch are
+    embedded once. Up to `max_inflight` batches are sent concurrently.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = EMBED_BATCH_SIZE,
+        max_wait_ms: float = EMBED_MAX_WAIT_MS,
+        max_inflight: int = EMBED_MAX_INFLIGHT,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_inflight), thread_name_prefix="embed-batch")
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "texts": 0,
+            "batches": 0,
+            "endpoint_texts": 0,
+            "deduplicated": 0,
+            "errors": 0,
+            "endpoint_seconds": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    # ---- public API ----
+    def submit(self, texts: List[str]) -> Future:
+        req = _Request(list(texts))
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["texts"] += len(req.texts)
+        if not req.texts:
+            req.future.set_result([])
+            return req.future
+        for i, text in enumerate(req.texts):
+            self._queue.put((req, i, text))
+        return req.future
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        future = self.submit(texts)
+        try:
+            return future.result(timeout=EMBED_RESULT_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"Embedding {len(texts)} texts took over {EMBED_RESULT_TIMEOUT_SECONDS:.0f}s")
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            s = dict(self._stats)
+        s["avg_batch_size"] = round(s["endpoint_texts"] / s["batches"], 2) if s["batches"] else 0.0
+        s["texts_per_call"] = round(s["texts"] / s["batches"], 2) if s["batches"] else 0.0
+        s["avg_batch_latency_ms"] = round(1000 * s["endpoint_seconds"] / s["batches"], 2) if s["batches"] else 0.0
+        s["endpoint_seconds"] = round(s["endpoint_seconds"], 3)
+        s["max_batch_size"] = self.max_batch_size
+        s["max_wait_ms"] = self.max_wait * 1000
+        return s
+
+    # ---- dispatcher ----
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[tuple]):
+        unique: Dict[str, int] = {}
+        for _, _, text in batch:
+            unique.setdefault(text, len(unique))
+        texts = list(unique)
+
+        t0 = time.perf_counter()
+        try:
+            vectors = self.embed_fn(texts)
+            if not isinstance(vectors, list) or len(vectors) != len(texts):
+                got = len(vectors) if isinstance(vectors, list) else type(vectors).__name__
+                raise ValueError(f"embedding endpoint returned {got} vectors for {len(texts)} texts")
+            error = None
+        except Exception as e:
+            logger.error(f"❌ Embedding batch of {len(texts)} texts failed: {e}")
+            vectors, error = None, e
+        elapsed = time.perf_counter() - t0
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["endpoint_texts"] += len(texts)
+            self._stats["deduplicated"] += len(batch) - len(texts)
+            self._stats["endpoint_seconds"] += elapsed
+            if error is not None:
+                self._stats["errors"] += 1
+
+        try:
+            for req, i, text in batch:
+                with req.lock:
+                    if req.future.done():
+                        continue
+                    if error is not None:
+                        req.future.set_exception(error)
+                        continue
+                    req.vectors[i] = vectors[unique[text]]
+                    req.pending -= 1
+                    if req.pending == 0:
+                        req.future.set_result(req.vectors)
+        except Exception as e:
+            # Never leave a caller blocked on a future this batch was meant to resolve
+            logger.error(f"❌ Handing out embedding batch failed: {e}")
+            for req, _, _ in batch:
+                with req.lock:
+                    if not req.future.done():
+                        req.future.set_exception(e)
+
+
+# -----------------------------
+# LangChain-compatible embeddings backed by the batcher
+# -----------------------------
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings facade that routes every call through a shared EmbeddingBatcher.
+    Texts found in the optional on-disk cache never reach the batcher; the
+    async methods do their (SQLite) cache reads/writes off the event loop.
+    """
+
+    def __init__(self, batcher: EmbeddingBatcher, cache: Optional[EmbeddingCache] = None):
+        self.batcher = batcher
+        self.cache = cache
+
+    def _split_cached(self, texts: List[str]):
+        cached = self.cache.get_many(texts) if self.cache else {}
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if self.cache:
+            count_cache("embedding", True, len(cached))
+            count_cache("embedding", False, len(missing))
+        return cached, missing
+
+    def _merge(self, texts, cached, missing, vectors) -> List[List[float]]:
+        if self.cache and missing:
+            self.cache.put_many([texts[i] for i in missing], vectors)
+        for i, vec in zip(missing, vectors):
+            cached[i] = vec
+        return [cached[i] for i in range(len(texts))]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached, missing = self._split_cached(texts)
+        vectors = self.batcher.embed([texts[i] for i in missing]) if missing else []
+        return self._merge(texts, cached, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.batcher.submit(texts)), EMBED_RESULT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Embedding {len(texts)} texts took over {EMBED_RESULT_TIMEOUT_SECONDS:.0f}s")
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not self.cache:
+            return await self._aembed(texts)
+        cached, missing = await run_blocking(self._split_cached, texts)
+        vectors = await self._aembed([texts[i] for i in missing])
+        if not missing:
+            return [cached[i] for i in range(len(texts))]
+        return await run_blocking(self._merge, texts, cached, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+# -----------------------------
+# Shared instance (lazy-loaded)
+# -----------------------------
+_embeddings = None
+_lock = threading.Lock()
+
+
+def _build_base_model() -> Embeddings:
+    if EMBEDDING_BACKEND == "local":
+        from app.services.local_embeddings import LocalOnnxEmbeddings
+        return LocalOnnxEmbeddings()
+
+    # Pooled connections, per-endpoint concurrency, retries and circuit breaking
+    from app.services.hf_models import HFEmbeddings
+    model = HFEmbeddings(EMBEDDING_MODEL)
+    logger.info(f"🌐 Hugging Face Endpoint embeddings model '{EMBEDDING_MODEL}' initialized.")
+    return model
+
+
+def embedding_model_key() -> str:
+    """Identity of the vectors this process produces (embedding cache namespace, chunker fingerprint)."""
+    # ONNX (and especially quantized) vectors differ slightly from the
+    # endpoint's, so each backend gets its own key
+    if EMBEDDING_BACKEND == "local":
+        from app.services.local_embeddings import LOCAL_EMBEDDING_MODEL_DIR, LOCAL_EMBEDDING_QUANTIZED, find_model_file
+        model_file = find_model_file(Path(LOCAL_EMBEDDING_MODEL_DIR), LOCAL_EMBEDDING_QUANTIZED)
+        return f"{EMBEDDING_MODEL}@local:{model_file.name}"
+    return EMBEDDING_MODEL
+
+
+def get_embeddings() -> BatchedEmbeddings:
+    """Process-wide embeddings shared by ingestion and queries."""
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            base = _build_base_model()
+            cache = EmbeddingCache(model=embedding_model_key()) if EMBEDDING_CACHE_ENABLED else None
+            _embeddings = BatchedEmbeddings(EmbeddingBatcher(base.embed_documents), cache)
+            logger.info(
+                f"📦 Embedding batcher ready (backend={EMBEDDING_BACKEND}, batch={EMBED_BATCH_SIZE}, wait={EMBED_MAX_WAIT_MS}ms, "
+                f"inflight={EMBED_MAX_INFLIGHT})"
+            )
+    return _embeddings
+
+
+def get_embedding_stats() -> Dict[str, Dict[str, float]]:
+    if _embeddings is None:
+        return {}
+    stats = {"batcher": _embeddings.batcher.stats()}
+    if _embeddings.cache:
+        stats["cache"] = _embeddings.cache.stats()
+    return stats
@@ -1,47 +1,237 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple, Union
+
+import httplib2
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from app.models.token_model import tokens_db
+from app.models.token_model import token_store
 from app.config import CLIENT_ID, CLIENT_SECRET
+from app.services.doc_parser import ParsedDoc, parse_document
+from app.services.metrics import timed
 
-def get_credentials(user_key="user"):
-    """Return refresh-token safe Credentials object."""
-    if user_key not in tokens_db:
+logger = logging.getLogger(__name__)
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+TOKEN_REFRESH_MARGIN = timedelta(seconds=int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300")))
+GOOGLE_HTTP_TIMEOUT = int(os.getenv("GOOGLE_HTTP_TIMEOUT", "30"))
+DOCS_BATCH_SIZE = int(os.getenv("DOCS_BATCH_SIZE", "50"))  # Google caps batches at 100 calls
+
+# -----------------------------
+# Credentials registry (one Credentials object per user)
+# -----------------------------
+_credentials = {}  # user_key → (token_info it was built from, Credentials)
+_credentials_lock = threading.Lock()
+_refresh_locks = {}  # user_key → Lock, so one slow refresh never blocks other users
+
+
+def _parse_expiry(value):
+    """google-auth compares expiry against naive UTC, so normalise to that."""
+    if not value:
         return None
-    token_info = tokens_db[user_key]
-    creds = Credentials(
-        token=token_info["token"],
-        refresh_token=token_info.get("refresh_token"),
-        client_id=CLIENT_ID,
-        client_secret=CLIENT_SECRET,
-        token_uri="https://oauth2.googleapis.com/token"
+    expiry = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if expiry.tzinfo is not None:
+        expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
+    return expiry
+
+
+def _needs_refresh(creds: Credentials) -> bool:
+    # Unknown expiry → leave it to the transport's refresh-on-401
+    if not creds.refresh_token or creds.expiry is None:
+        return False
+    expiry = creds.expiry.replace(tzinfo=timezone.utc)
+    return expiry - datetime.now(timezone.utc) < TOKEN_REFRESH_MARGIN
+
+
+def _refresh(creds: Credentials, user_key: str):
+    """Refresh ahead of expiry so a long batch never fails mid-way."""
+    creds.refresh(Request())
+    # Write back so other workers pick up the fresh token instead of refreshing again
+    token_store.update(
+        user_key,
+        token=creds.token,
+        expiry=creds.expiry.isoformat() if creds.expiry else None
     )
+    token_info = token_store.get(user_key)
+    with _credentials_lock:
+        _credentials[user_key] = (token_info, creds)
+    logger.info(f"🔄 Google access token refreshed for '{user_key}'")
+
+
+def get_credentials(user_key="user"):
+    """Return refresh-token safe Credentials object (cached and refreshed ahead of expiry)."""
+    token_info = token_store.get(user_key)
+    if token_info is None:
+        return None
+    with _credentials_lock:
+        cached = _credentials.get(user_key)
+        if cached is None or cached[0] != token_info:
+            # First use, new login, or another worker refreshed the token → rebuild
+            creds = Credentials(
+                token=token_info["token"],
+                refresh_token=token_info.get("refresh_token"),
+                client_id=CLIENT_ID,
+                client_secret=CLIENT_SECRET,
+                token_uri=TOKEN_URI,
+                expiry=_parse_expiry(token_info.get("expiry"))
+            )
+            _credentials[user_key] = (token_info, creds)
+        else:
+            creds = cached[1]
+        refresh_lock = _refresh_locks.setdefault(user_key, threading.Lock())
+
+    # The network refresh runs outside the registry lock
+    if _needs_refresh(creds):
+        with refresh_lock:
+            with _credentials_lock:
+                creds = _credentials[user_key][1]
+            # Another thread may have refreshed while we waited
+            if _needs_refresh(creds):
+                _refresh(creds, user_key)
     return creds
 
-def list_docs(user_key="user", page_size=10):
+
+# -----------------------------
+# Service registry
+# -----------------------------
+# httplib2 connections are not thread-safe, so each thread keeps its own
+# keep-alive transport per user, shared by the Drive and Docs services.
+_local = threading.local()
+
+
+def get_service(api: str, version: str, user_key="user"):
     creds = get_credentials(user_key)
     if not creds:
         return None
-    service = build("drive", "v3", credentials=creds)
+    registry = getattr(_local, "registry", None)
+    if registry is None:
+        registry = _local.registry = {}
+
+    entry = registry.get(user_key)
+    if entry is None or entry["creds"] is not creds:
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT))
+        entry = registry[user_key] = {"creds": creds, "http": http, "services": {}}
+
+    service = entry["services"].get((api, version))
+    if service is None:
+        service = build(api, version, http=entry["http"], cache_discovery=False)
+        entry["services"][(api, version)] = service
+    return service
+
+
+# -----------------------------
+# Drive / Docs API
+# -----------------------------
+DOC_LIST_FIELDS = "nextPageToken, files(id, name, modifiedTime, headRevisionId, size, quotaBytesUsed)"
+DOC_QUERY = "mimeType='application/vnd.google-apps.document' and trashed=false"
+
+
+def list_docs_page(user_key="user", page_size=100, page_token=None):
+    """One page of the Drive listing → (files, next_page_token), or None if not authenticated."""
+    service = get_service("drive", "v3", user_key)
+    if not service:
+        return None
     results = service.files().list(
-        q="mimeType='application/vnd.google-apps.document'",
-        pageSize=page_size,
-        fields="files(id, name)"
+        q=DOC_QUERY,
+        pageSize=min(max(page_size, 1), 1000),
+        pageToken=page_token,
+        fields=DOC_LIST_FIELDS
     ).execute()
-    return results.get("files", [])
+    return results.get("files", []), results.get("nextPageToken")
+
+
+def iter_docs(user_key="user", page_size=1000) -> Iterator[dict]:
+    """Stream every Google Doc in the user's Drive, following nextPageToken."""
+    page_token = None
+    while True:
+        page = list_docs_page(user_key, page_size, page_token)
+        if page is None:
+            return
+        files, page_token = page
+        yield from files
+        if not page_token:
+            return
+
 
 def get_doc_content(doc_id, user_key="user"):
-    creds = get_credentials(user_key)
-    if not creds:
+    parsed = get_doc_structure(doc_id, user_key)
+    return parsed.text if parsed is not None else None
+
+
+def get_doc_structure(doc_id, user_key="user") -> Optional[ParsedDoc]:
+    """Full doc text plus heading-path sections with character offsets."""
+    service = get_service("docs", "v1", user_key)
+    if not service:
         return None
-    service = build("docs", "v1", credentials=creds)
-    doc = service.documents().get(documentId=doc_id).execute()
-
-    content = ""
-    for element in doc.get("body", {}).get("content", []):
-        paragraph = element.get("paragraph")
-        if paragraph:
-            for elem in paragraph.get("elements", []):
-                text_run = elem.get("textRun")
-                if text_run:
-                    content += text_run.get("content", "")
-    return content
+    with timed("drive_fetch"):
+        doc = service.documents().get(documentId=doc_id).execute()
+    with timed("parse"):
+        return parse_document(doc)
+
+
+def iter_doc_contents(
+    doc_ids: List[str],
+    user_key="user",
+    batch_size: int = DOCS_BATCH_SIZE,
+    service=None,
+    http=None,
+    structured: bool = False
+) -> Iterator[Tuple[str, Optional[Union[str, ParsedDoc]], Optional[Exception]]]:
+    """
+    Bulk-fetch docs through the Google batch endpoint, `batch_size` docs per
+    HTTP round trip. Yields (doc_id, text, error) as each batch returns;
+    exactly one of text/error is set. With `structured=True` the text is the
+    full ParsedDoc (sections + offsets).
+
+    `service`/`http` let tests drive this with googleapiclient's HttpMock
+    helpers instead of the live API.
+    Every doc id gets exactly one result, even when credentials or parsing fail.
+    """
+    doc_ids = list(dict.fromkeys(doc_ids))  # batch request ids must be unique
+    try:
+        service = service or get_service("docs", "v1", user_key)
+        if not service:
+            raise RuntimeError(f"No Google credentials for '{user_key}'")
+    except Exception as e:
+        logger.error(f"❌ Docs service unavailable ({len(doc_ids)} docs): {e}")
+        for doc_id in doc_ids:
+            yield doc_id, None, e
+        return
+    batch_size = max(1, min(batch_size, 100))
+
+    for start in range(0, len(doc_ids), batch_size):
+        chunk = doc_ids[start:start + batch_size]
+        responses = {}
+
+        def _collect(request_id, response, exception):
+            responses[request_id] = (response, exception)
+
+        batch = service.new_batch_http_request(callback=_collect)
+        for doc_id in chunk:
+            batch.add(service.documents().get(documentId=doc_id), request_id=doc_id)
+        try:
+            with timed("drive_fetch", docs=len(chunk)):
+                batch.execute(http=http)
+        except Exception as e:
+            logger.error(f"❌ Docs batch request failed ({len(chunk)} docs): {e}")
+            for doc_id in chunk:
+                yield doc_id, None, e
+            continue
+
+        for doc_id in chunk:
+            response, exception = responses.get(doc_id, (None, RuntimeError("missing batch response")))
+            if exception is not None:
+                yield doc_id, None, exception
+            else:
+                try:
+                    with timed("parse"):
+                        parsed = parse_document(response)
+                except Exception as e:
+                    logger.error(f"❌ Could not parse document {doc_id}: {e}")
+                    yield doc_id, None, e
+                    continue
+                yield doc_id, parsed if structured else parsed.text, None
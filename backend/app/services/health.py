@@ -0,0 +1,244 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "30"))
+# A generation costs quota, so the LLM is probed far less often (1 token)
+HEALTH_LLM_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_LLM_PROBE_INTERVAL_SECONDS", "300"))
+HEALTH_LLM_PROBE_ENABLED = os.getenv("HEALTH_LLM_PROBE_ENABLED", "true").lower() == "true"
+# Readiness fails when these haven't succeeded recently. Remote HF endpoints (embeddings, LLM) are
+# left out: their outages hit every replica alike, so they report "degraded" instead of unready
+HEALTH_CRITICAL_PROBES = {p.strip() for p in os.getenv("HEALTH_CRITICAL_PROBES", "vectordb").split(",") if p.strip()}
+HEALTH_RETRY_SECONDS = float(os.getenv("HEALTH_RETRY_SECONDS", "5"))  # re-probe sooner while failing / warming up
+HEALTH_STALE_FACTOR = float(os.getenv("HEALTH_STALE_FACTOR", "3"))  # × interval without a success → stale
+HEALTH_HISTORY_SIZE = int(os.getenv("HEALTH_HISTORY_SIZE", "120"))
+
+ProbeFn = Callable[[], Optional[Dict[str, Any]]]  # raises on failure; may return details
+
+
+@dataclass
+class ProbeState:
+    name: str
+    interval: float
+    critical: bool
+    ok: Optional[bool] = None  # None → not run yet
+    running: bool = False
+    last_checked: Optional[float] = None
+    last_success: Optional[float] = None
+    last_error: Optional[str] = None
+    latency_ms: Optional[float] = None
+    consecutive_failures: int = 0
+    details: Dict[str, Any] = field(default_factory=dict)
+    history: deque = field(default_factory=lambda: deque(maxlen=HEALTH_HISTORY_SIZE))  # (ts, latency_ms, ok)
+    latency_summary: Dict[str, float] = field(default_factory=dict)
+
+    def due(self, now: float) -> bool:
+        if self.running:
+            return False
+        if self.last_checked is None:
+            return True
+        interval = self.interval if self.ok else min(self.interval, HEALTH_RETRY_SECONDS)
+        return now - self.last_checked >= interval
+
+    def fresh(self, now: float) -> bool:
+        return (
+            self.ok is True
+            and self.last_success is not None
+            and now - self.last_success <= self.interval * HEALTH_STALE_FACTOR
+        )
+
+
+def _summarize(history: deque) -> Dict[str, float]:
+    latencies = sorted(ms for _, ms, ok in history if ok)
+    if not latencies:
+        return {}
+    return {
+        "samples": len(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "max_ms": latencies[-1],
+    }
+
+
+# -----------------------------
+# Background health monitor
+# -----------------------------
+class HealthMonitor:
+    """
+    Runs registered probes on their own schedule in the background and keeps
+    the latest result, last-success time and a latency history per probe.
+    Liveness/readiness only read that cached state, so probing an endpoint
+    never triggers an embedding or LLM call.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0):
+        self.tick = tick_seconds
+        self.started_at = time.time()
+        self._probes: Dict[str, Tuple[ProbeFn, ProbeState]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="health-probe")
+
+    def register(self, name: str, fn: ProbeFn, interval: float, critical: bool = False):
+        with self._lock:
+            self._probes[name] = (fn, ProbeState(name=name, interval=interval, critical=critical))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"🩺 Health monitor started ({', '.join(self._probes)})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while True:
+            now = time.time()
+            with self._lock:
+                due = [state for _, state in self._probes.values() if state.due(now)]
+                for state in due:
+                    state.running = True
+            for state in due:
+                self._pool.submit(self._run, state.name)
+            if self._stop.wait(self.tick):
+                return
+
+    def _run(self, name: str):
+        fn, state = self._probes[name]
+        started = time.perf_counter()
+        try:
+            details, error = fn() or {}, None
+        except Exception as e:
+            details, error = {}, f"{type(e).__name__}: {e}"
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        now = time.time()
+
+        with self._lock:
+            state.running = False
+            state.last_checked = now
+            state.latency_ms = latency_ms
+            state.ok = error is None
+            state.history.append((round(now, 3), latency_ms, state.ok))
+            if error is None:
+                state.last_success = now
+                state.last_error = None
+                state.consecutive_failures = 0
+                state.details = details
+                state.latency_summary = _summarize(state.history)
+            else:
+                state.last_error = error
+                state.consecutive_failures += 1
+        if error is not None:
+            logger.warning(f"🩺 Probe '{name}' failed ({state.consecutive_failures}x): {error}")
+
+    def run_probes(self):
+        """Run every probe once, synchronously (startup checks / scripts)."""
+        for name in list(self._probes):
+            self._run(name)
+
+    # ---- cheap reads (no I/O) ----
+    def probe(self, name: str) -> Optional[ProbeState]:
+        entry = self._probes.get(name)
+        return entry[1] if entry is not None else None
+
+    def liveness(self) -> Dict[str, Any]:
+        return {"status": "alive", "uptime_seconds": round(time.time() - self.started_at, 1)}
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        now = time.time()
+        checks, degraded = {}, False
+        with self._lock:
+            for _, state in self._probes.values():
+                checks[state.name] = {
+                    "ok": state.fresh(now),
+                    "critical": state.critical,
+                    "last_success_age_s": round(now - state.last_success, 1) if state.last_success else None,
+                    "latency_ms": state.latency_ms,
+                }
+                # A non-critical probe that has run and isn't healthy degrades, never unreadies
+                degraded |= not state.critical and state.last_checked is not None and not checks[state.name]["ok"]
+        ready = all(c["ok"] for c in checks.values() if c["critical"])
+        status = "unready" if not ready else "degraded" if degraded else "ok"
+        return ready, {"ready": ready, "status": status, "checks": checks}
+
+    def snapshot(self, include_history: bool = False) -> Dict[str, Any]:
+        now = time.time()
+        ready, summary = self.readiness()
+        probes = {}
+        with self._lock:
+            for _, state in self._probes.values():
+                probes[state.name] = {
+                    "ok": state.ok,
+                    "fresh": state.fresh(now),
+                    "critical": state.critical,
+                    "interval_s": state.interval,
+                    "last_checked": state.last_checked,
+                    "last_success": state.last_success,
+                    "last_error": state.last_error,
+                    "consecutive_failures": state.consecutive_failures,
+                    "latency_ms": state.latency_ms,
+                    "latency": state.latency_summary,
+                    "details": state.details,
+                }
+                if include_history:
+                    probes[state.name]["history"] = list(state.history)
+        return {"ready": ready, "status": summary["status"], **self.liveness(), "probes": probes, "circuits": _hf_circuits()}
+
+
+# -----------------------------
+# Default probes
+# -----------------------------
+def _probe_vectordb() -> Dict[str, Any]:
+    from app.services.store_manager import store_manager
+    if not store_manager.ready:
+        raise RuntimeError(store_manager.error or "vector store still warming up")
+    status = store_manager.status()
+    if status.get("error"):
+        raise RuntimeError(status["error"])
+    return {"owners": status.get("owners", 0), "chunks": status.get("chunks", 0), "warmup_seconds": status["warmup_seconds"]}
+
+
+def _probe_embeddings() -> Dict[str, Any]:
+    from app.services.embedding_service import get_embeddings
+    # Straight to the batcher: the embedding cache would answer without touching the endpoint
+    vector = get_embeddings().batcher.embed(["health check"])[0]
+    if not vector:
+        raise RuntimeError("empty embedding")
+    return {"dimensions": len(vector)}
+
+
+def _probe_llm() -> Dict[str, Any]:
+    from app.workflows.query_docs import get_chat_model
+    chat = get_chat_model()
+    reply = chat.invoke("ping", max_tokens=1)
+    return {"model": getattr(chat, "model", None), "replied": bool(getattr(reply, "content", reply))}
+
+
+def _hf_circuits() -> Dict[str, Any]:
+    from app.services.hf_client import get_hf_client_stats
+    return {name: s["circuit"] for name, s in get_hf_client_stats().items()}
+
+
+health_monitor = HealthMonitor()
+health_monitor.register(
+    "vectordb", _probe_vectordb, HEALTH_PROBE_INTERVAL_SECONDS, "vectordb" in HEALTH_CRITICAL_PROBES
+)
+health_monitor.register(
+    "embeddings", _probe_embeddings, HEALTH_PROBE_INTERVAL_SECONDS, "embeddings" in HEALTH_CRITICAL_PROBES
+)
+if HEALTH_LLM_PROBE_ENABLED:
+    health_monitor.register("llm", _probe_llm, HEALTH_LLM_PROBE_INTERVAL_SECONDS, "llm" in HEALTH_CRITICAL_PROBES)
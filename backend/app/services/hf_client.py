@@ -0,0 +1,565 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.services.metrics import UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HF_TOKEN = os.getenv("HF_TOKEN")
+# Point these at a local fake (benchmarks/fake_hf_server.py) to test without the real API
+HF_INFERENCE_URL = os.getenv("HF_INFERENCE_URL", "https://router.huggingface.co/hf-inference")
+HF_CHAT_URL = os.getenv("HF_CHAT_URL", "https://router.huggingface.co/v1")
+
+HF_CONNECT_TIMEOUT = float(os.getenv("HF_CONNECT_TIMEOUT", "5"))
+HF_MAX_CONNECTIONS = int(os.getenv("HF_MAX_CONNECTIONS", "32"))
+HF_MAX_RETRIES = int(os.getenv("HF_MAX_RETRIES", "3"))
+HF_RETRY_BASE_MS = float(os.getenv("HF_RETRY_BASE_MS", "250"))
+HF_RETRY_MAX_MS = float(os.getenv("HF_RETRY_MAX_MS", "8000"))
+HF_BREAKER_FAILURES = int(os.getenv("HF_BREAKER_FAILURES", "5"))  # consecutive failed attempts
+HF_BREAKER_RESET_SECONDS = float(os.getenv("HF_BREAKER_RESET_SECONDS", "30"))
+
+# Statuses worth retrying (rate limit, timeouts, overloaded / cold-starting model)
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """An HF endpoint call failed after retries (or was rejected by the circuit breaker)."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        message: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        retryable: bool = True
+    ):
+        super().__init__(f"{endpoint}: {message}")
+        self.endpoint = endpoint
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(endpoint, "circuit open, failing fast", retry_after=retry_after, retryable=False)
+
+
+# -----------------------------
+# Circuit breaker
+# -----------------------------
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` consecutive failed attempts;
+    open rejects calls for `reset_seconds`, then lets one trial call through
+    (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = HF_BREAKER_FAILURES, reset_seconds: float = HF_BREAKER_RESET_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if now - self.opened_at < self.reset_seconds else "half_open"
+
+    def allow(self) -> Optional[str]:
+        """None → reject; "trial" → the single half-open probe call, which must end with end_trial()."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return "closed"
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return "trial"
+            return None
+
+    def end_trial(self):
+        """A trial that ended without an outcome (cancelled, unexpected error) counts as a failure."""
+        with self._lock:
+            unresolved = self._trial_running
+        if unresolved:
+            self.record_failure()
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("✅ Circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    logger.warning(f"🚫 Circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+# -----------------------------
+# Concurrency limit shared by threads and coroutines
+# -----------------------------
+class _Slots:
+    """
+    Semaphore usable from worker threads (ingestion, streaming) and from any
+    event loop (async queries), so one limit covers both. A released slot is
+    handed straight to the oldest waiter (FIFO).
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self._waiters = deque()  # threading.Event | (loop, future)
+        self._lock = threading.Lock()
+
+    def _take(self) -> bool:
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return True
+        return False
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            return self._take()
+
+    def acquire(self):
+        with self._lock:
+            if self._take():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take():
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            if handed_over:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self.in_use -= 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+
+# -----------------------------
+# Endpoints
+# -----------------------------
+@dataclass
+class EndpointConfig:
+    name: str
+    base_url: str
+    concurrency: int
+    timeout: float  # read timeout per attempt (seconds)
+    max_retries: int = HF_MAX_RETRIES
+    hedge_after_ms: float = 0.0  # 0 disables hedging
+
+
+def _env_endpoint(name: str, base_url: str, concurrency: int, timeout: float, hedge_after_ms: float) -> EndpointConfig:
+    prefix = f"HF_{name.upper()}_"
+    return EndpointConfig(
+        name=name,
+        base_url=base_url.rstrip("/"),
+        concurrency=int(os.getenv(prefix + "CONCURRENCY", str(concurrency))),
+        timeout=float(os.getenv(prefix + "TIMEOUT", str(timeout))),
+        hedge_after_ms=float(os.getenv(prefix + "HEDGE_AFTER_MS", str(hedge_after_ms))),
+    )
+
+
+DEFAULT_ENDPOINTS = [
+    # Embedding calls are small and idempotent: hedge the slow tail
+    _env_endpoint("embeddings", HF_INFERENCE_URL, concurrency=4, timeout=30, hedge_after_ms=1500),
+    # Generation is expensive; hedging would double the bill, so it's opt-in
+    _env_endpoint("chat", HF_CHAT_URL, concurrency=8, timeout=120, hedge_after_ms=0),
+]
+
+
+class Endpoint:
+    def __init__(self, config: EndpointConfig):
+        self.config = config
+        self.slots = _Slots(config.concurrency)
+        self.breaker = CircuitBreaker()
+        self._stats = {
+            "requests": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "rejected": 0,
+        }
+        self._lock = threading.Lock()
+
+    def count(self, outcome: str):
+        with self._lock:
+            self._stats[outcome] += 1
+        UPSTREAM_REQUESTS.inc(endpoint=self.config.name, outcome=outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        s.update(
+            circuit=self.breaker.state,
+            in_flight=self.slots.in_use,
+            concurrency=self.slots.limit,
+            hedge_after_ms=self.config.hedge_after_ms,
+        )
+        return s
+
+
+def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+    """Full-jitter exponential backoff (seconds); a server Retry-After wins if longer."""
+    delay = random.uniform(0, min(HF_RETRY_MAX_MS, HF_RETRY_BASE_MS * 2 ** (attempt - 1))) / 1000
+    return max(delay, retry_after or 0.0)
+
+
+def _retry_after(response) -> Optional[float]:
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(value), HF_RETRY_MAX_MS / 1000) if value else None
+    except ValueError:
+        return None
+
+
+# -----------------------------
+# Resilient HF client
+# -----------------------------
+class HFClient:
+    """
+    One pooled HTTP client per process for every HF endpoint, with per
+    endpoint concurrency slots, jittered retries on 429/5xx/transport
+    errors, optional hedging and a circuit breaker that fails fast.
+    """
+
+    def __init__(self, endpoints=DEFAULT_ENDPOINTS, token: Optional[str] = HF_TOKEN):
+        self.endpoints = {c.name: Endpoint(c) for c in endpoints}
+        self.token = token
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()  # loop → httpx.AsyncClient
+        # Room for every slot plus one hedge per slot
+        self._hedge_pool = ThreadPoolExecutor(
+            max_workers=sum(2 * c.concurrency for c in endpoints), thread_name_prefix="hf-hedge"
+        )
+        self._lock = threading.Lock()
+
+    # ---- transport ----
+    def _client_kwargs(self) -> dict:
+        import httpx
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        return {
+            "headers": headers,
+            "timeout": httpx.Timeout(60.0, connect=HF_CONNECT_TIMEOUT),
+            "limits": httpx.Limits(max_connections=HF_MAX_CONNECTIONS, max_keepalive_connections=HF_MAX_CONNECTIONS),
+        }
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+                    self._client = httpx.Client(**self._client_kwargs())
+        return self._client
+
+    def _async_client(self):
+        # httpx.AsyncClient connections belong to the loop that opened them
+        import httpx
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(**self._client_kwargs())
+        return client
+
+    def _endpoint(self, name: str) -> Endpoint:
+        endpoint = self.endpoints.get(name)
+        if endpoint is None:
+            raise ValueError(f"Unknown HF endpoint '{name}' (expected one of {list(self.endpoints)})")
+        return endpoint
+
+    def _url(self, endpoint: Endpoint, path: str) -> str:
+        return endpoint.config.base_url + path
+
+    @staticmethod
+    def _transport_errors():
+        import httpx
+        return (httpx.TransportError,)
+
+    # ---- sync ----
+    def _post(self, endpoint: Endpoint, path: str, payload: dict):
+        return self.client.post(self._url(endpoint, path), json=payload, timeout=endpoint.config.timeout)
+
+    def _post_extra_slot(self, endpoint: Endpoint, path: str, payload: dict):
+        try:
+            return self._post(endpoint, path, payload)
+        finally:
+            endpoint.slots.release()
+
+    def _send(self, endpoint: Endpoint, path: str, payload: dict):
+        """One attempt; with hedging, a second copy races the first once it is slow."""
+        hedge_after = endpoint.config.hedge_after_ms / 1000
+        if hedge_after <= 0:
+            return self._post(endpoint, path, payload)
+        first = self._hedge_pool.submit(self._post, endpoint, path, payload)
+        done, _ = wait([first], timeout=hedge_after)
+        # Only hedge with a spare slot, so hedges never exceed the endpoint's limit
+        if done or not endpoint.slots.try_acquire():
+            return first.result()
+        endpoint.count("hedges")
+        second = self._hedge_pool.submit(self._post_extra_slot, endpoint, path, payload)
+        pending, error, response = {first, second}, None, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if response.status_code not in RETRY_STATUSES:
+                    if future is second:
+                        endpoint.count("hedge_wins")
+                    return response
+        if response is not None:
+            return response
+        raise error
+
+    def post_json(self, name: str, path: str, payload: dict) -> Any:
+        endpoint = self._endpoint(name)
+        endpoint.slots.acquire()
+        try:
+            return self._with_retries(endpoint, lambda: self._send(endpoint, path, payload)).json()
+        finally:
+            endpoint.slots.release()
+
+    def _with_retries(self, endpoint: Endpoint, send):
+        attempt = 0
+        while True:
+            error, trial = self._admit(endpoint)
+            if error is None:
+                started = time.perf_counter()
+                try:
+                    response, error = self._check(endpoint, send())
+                except self._transport_errors() as e:
+                    response, error = None, self._failed(endpoint, UpstreamError(endpoint.config.name, f"{type(e).__name__}: {e}"))
+                finally:
+                    UPSTREAM_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint.config.name)
+                    if trial:
+                        endpoint.breaker.end_trial()
+                if error is None:
+                    return response
+            attempt += 1
+            if attempt > endpoint.config.max_retries or not error.retryable:
+                raise error
+            endpoint.count("retries")
+            time.sleep(_backoff(attempt, error.retry_after))
+
+    # ---- shared attempt bookkeeping ----
+    def _admit(self, endpoint: Endpoint) -> Tuple[Optional[UpstreamError], bool]:
+        """(rejection error or None, whether this attempt is the breaker's half-open trial)."""
+        admitted = endpoint.breaker.allow()
+        if admitted is not None:
+            endpoint.count("requests")
+            return None, admitted == "trial"
+        endpoint.count("rejected")
+        return CircuitOpenError(endpoint.config.name, endpoint.breaker.retry_after()), False
+
+    def _check(self, endpoint: Endpoint, response):
+        if response.status_code < 400:
+            endpoint.breaker.record_success()
+            endpoint.count("succeeded")
+            return response, None
+        status = response.status_code
+        error = UpstreamError(
+            endpoint.config.name, f"HTTP {status}: {response.text[:200]}", status, _retry_after(response),
+            retryable=status in RETRY_STATUSES
+        )
+        if not error.retryable:
+            # Our request is wrong (400/401/404...): retrying or tripping the breaker won't help
+            endpoint.breaker.record_success()
+            endpoint.count("failed")
+            return None, error
+        return None, self._failed(endpoint, error)
+
+    def _failed(self, endpoint: Endpoint, error: UpstreamError) -> UpstreamError:
+        endpoint.breaker.record_failure()
+        endpoint.count("failed")
+        logger.warning(f"⚠️ HF {error}")
+        return error
+
+    def stream_events(self, name: str, path: str, payload: dict) -> Iterator[dict]:
+        """
+        POST with `stream: true` and yield each server-sent `data:` JSON event.
+        Retries only happen before the first event; once tokens have been
+        yielded a failure propagates (a retry would repeat them).
+        """
+        endpoint = self._endpoint(name)
+        endpoint.slots.acquire()
+        try:
+            def open_stream():
+                request = self.client.build_request(
+                    "POST", self._url(endpoint, path), json=payload, timeout=endpoint.config.timeout
+                )
+                response = self.client.send(request, stream=True)
+                if response.status_code >= 400:
+                    response.read()
+                    response.close()
+                return response
+
+            response = self._with_retries(endpoint, open_stream)
+            try:
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    yield json.loads(data)
+            finally:
+                response.close()
+        finally:
+            endpoint.slots.release()
+
+    # ---- async ----
+    async def _asend(self, endpoint: Endpoint, path: str, payload: dict):
+        client = self._async_client()
+        url = self._url(endpoint, path)
+
+        async def post():
+            return await client.post(url, json=payload, timeout=endpoint.config.timeout)
+
+        hedge_after = endpoint.config.hedge_after_ms / 1000
+        if hedge_after <= 0:
+            return await post()
+        first = asyncio.ensure_future(post())
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done or not endpoint.slots.try_acquire():
+            return await first
+        endpoint.count("hedges")
+        second = asyncio.ensure_future(post())
+        try:
+            pending, error, response = {first, second}, None, None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    if response.status_code not in RETRY_STATUSES:
+                        if task is second:
+                            endpoint.count("hedge_wins")
+                        return response
+            if response is not None:
+                return response
+            raise error
+        finally:
+            for task in (first, second):
+                task.cancel()
+            endpoint.slots.release()
+
+    async def apost_json(self, name: str, path: str, payload: dict) -> Any:
+        """Async twin of post_json (same slots, breaker and retry policy)."""
+        endpoint = self._endpoint(name)
+        await endpoint.slots.aacquire()
+        try:
+            attempt = 0
+            while True:
+                error, trial = self._admit(endpoint)
+                if error is None:
+                    started = time.perf_counter()
+                    try:
+                        response, error = self._check(endpoint, await self._asend(endpoint, path, payload))
+                    except self._transport_errors() as e:
+                        response, error = None, self._failed(endpoint, UpstreamError(name, f"{type(e).__name__}: {e}"))
+                    finally:
+                        UPSTREAM_SECONDS.observe(time.perf_counter() - started, endpoint=name)
+                        if trial:
+                            endpoint.breaker.end_trial()
+                    if error is None:
+                        return response.json()
+                attempt += 1
+                if attempt > endpoint.config.max_retries or not error.retryable:
+                    raise error
+                endpoint.count("retries")
+                await asyncio.sleep(_backoff(attempt, error.retry_after))
+        finally:
+            endpoint.slots.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: endpoint.stats() for name, endpoint in self.endpoints.items()}
+
+
+# -----------------------------
+# Shared instance (lazy-loaded)
+# -----------------------------
+_hf_client: Optional[HFClient] = None
+_hf_client_lock = threading.Lock()
+
+
+def get_hf_client() -> HFClient:
+    global _hf_client
+    with _hf_client_lock:
+        if _hf_client is None:
+            _hf_client = HFClient()
+            logger.info(
+                "🌐 HF client ready: " + ", ".join(
+                    f"{c.name} → {c.base_url} (concurrency={c.concurrency}, hedge={c.hedge_after_ms:g}ms)"
+                    for c in DEFAULT_ENDPOINTS
+                )
+            )
+    return _hf_client
+
+
+def get_hf_client_stats() -> Dict[str, Dict[str, Any]]:
+    return _hf_client.stats() if _hf_client is not None else {}
@@ -0,0 +1,103 @@
+import logging
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, convert_to_openai_messages
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.services.hf_client import get_hf_client
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Embeddings (HF Inference feature-extraction)
+# -----------------------------
+def _sentence_vectors(data: Any) -> List[List[float]]:
+    # Sentence-transformers models return one vector per input; plain
+    # transformers return per-token vectors, which are mean-pooled here
+    vectors = []
+    for item in data:
+        if item and isinstance(item[0], list):
+            vectors.append([sum(col) / len(item) for col in zip(*item)])
+        else:
+            vectors.append(item)
+    return vectors
+
+
+class HFEmbeddings(Embeddings):
+    """Feature-extraction endpoint called through the shared resilient HF client."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.path = f"/models/{model}/pipeline/feature-extraction"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return _sentence_vectors(get_hf_client().post_json("embeddings", self.path, {"inputs": texts}))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return _sentence_vectors(await get_hf_client().apost_json("embeddings", self.path, {"inputs": texts}))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+# -----------------------------
+# Chat (OpenAI-compatible chat completions on the HF router)
+# -----------------------------
+class HFChatModel(BaseChatModel):
+    """Drop-in for ChatHuggingFace: invoke/ainvoke/stream over the resilient HF client."""
+
+    model: str
+    max_tokens: int = 512
+    temperature: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "documind-hf-chat"
+
+    def _payload(self, messages: List[BaseMessage], stop: Optional[List[str]], stream: bool = False, **kwargs) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": convert_to_openai_messages(messages),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "stream": stream,
+        }
+        if self.temperature is not None:
+            payload["temperature"] = self.temperature
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    @staticmethod
+    def _result(data: dict) -> ChatResult:
+        message = data["choices"][0]["message"]
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=message.get("content") or ""))],
+            llm_output={"token_usage": data.get("usage", {}), "model": data.get("model")},
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self._result(get_hf_client().post_json("chat", "/chat/completions", self._payload(messages, stop, **kwargs)))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self._result(await get_hf_client().apost_json("chat", "/chat/completions", self._payload(messages, stop, **kwargs)))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        for event in get_hf_client().stream_events("chat", "/chat/completions", self._payload(messages, stop, stream=True, **kwargs)):
+            choices = event.get("choices") or []
+            token = (choices[0].get("delta") or {}).get("content") if choices else None
+            if not token:
+                continue
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
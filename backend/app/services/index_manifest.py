@@ -0,0 +1,114 @@
+import os
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.services.partitions import DEFAULT_OWNER, partition_path
+
+logger = logging.getLogger(__name__)
+
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", "./index_manifest/manifest.sqlite")
+
+
+# -----------------------------
+# Per-doc index manifest
+# -----------------------------
+class IndexManifest:
+    """
+    Records, per indexed doc, the Drive version it was built from and the
+    content-hash chunk IDs stored in Chroma. Lets re-processing skip
+    unchanged docs and touch only the chunks that actually changed.
+    Its chunks table doubles as the doc→chunk-id index used for exact
+    search over selected docs.
+    """
+
+    def __init__(self, path: str = INDEX_MANIFEST_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id TEXT PRIMARY KEY,
+                version TEXT,
+                chunk_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                doc_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                PRIMARY KEY (doc_id, chunk_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def get_version(self, doc_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def has_doc(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM docs WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def get_chunk_ids(self, doc_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT chunk_id FROM chunks WHERE doc_id = ?", (doc_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    def record(self, doc_id: str, chunk_ids: List[str], version: Optional[str] = None):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (doc_id, chunk_id) VALUES (?, ?)",
+                [(doc_id, cid) for cid in chunk_ids]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docs (doc_id, version, chunk_count, updated_at) VALUES (?, ?, ?, ?)",
+                (doc_id, version, len(chunk_ids), time.time())
+            )
+            self._conn.commit()
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+            self._conn.commit()
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT doc_id, version FROM docs").fetchall())
+
+
+_manifests: Dict[str, IndexManifest] = {}
+_lock = threading.Lock()
+
+
+def get_manifest(owner: str = DEFAULT_OWNER) -> IndexManifest:
+    """One manifest per owner partition."""
+    with _lock:
+        manifest = _manifests.get(owner)
+        if manifest is None:
+            path = partition_path(INDEX_MANIFEST_PATH, owner)
+            manifest = _manifests[owner] = IndexManifest(path)
+            logger.info(f"🗂️ Index manifest loaded from {path}")
+    return manifest
+
+
+def doc_version(file_info: dict, chunker: Optional[str] = None) -> Optional[str]:
+    """
+    Drive listing entry → version string (modifiedTime + headRevisionId when
+    present), plus the chunker fingerprint so a chunking change re-indexes
+    docs that weren't edited.
+    """
+    modified = file_info.get("modifiedTime")
+    if not modified:
+        return None
+    revision = file_info.get("headRevisionId")
+    version = f"{modified}:{revision}" if revision else modified
+    return f"{version}#{chunker}" if chunker else version
@@ -0,0 +1,185 @@
+import os
+import re
+import math
+import logging
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.partitions import DEFAULT_OWNER, partition_path
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index/chunks.sqlite")
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Keeps identifiers such as "ERR-1042", "user_id" or "v2.3.1" whole
+_TOKEN_RE = re.compile(r"\w+(?:[-./:]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        # ...and also index their parts, so "1042" finds "ERR-1042"
+        parts = re.split(r"[-./:]", match)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+# -----------------------------
+# BM25 inverted index
+# -----------------------------
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over chunk texts, persisted to SQLite so
+    it survives restarts. Kept in sync with Chroma per doc by
+    vector_store_service.apply_doc_update.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, text TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id)")
+        self._conn.commit()
+
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term → {chunk_id: tf}
+        self._lengths: Dict[str, int] = {}
+        self._doc_of: Dict[str, str] = {}
+        self._total_length = 0
+        for chunk_id, doc_id, text in self._conn.execute("SELECT chunk_id, doc_id, text FROM chunks"):
+            self._add_memory(chunk_id, doc_id, text)
+        logger.info(f"🔎 Lexical index loaded: {len(self._lengths)} chunks from {path}")
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    # ---- in-memory maintenance ----
+    def _add_memory(self, chunk_id: str, doc_id: str, text: str):
+        if chunk_id in self._lengths:
+            self._remove_memory(chunk_id)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings[term][chunk_id] = tf
+        length = sum(counts.values())
+        self._lengths[chunk_id] = length
+        self._doc_of[chunk_id] = doc_id
+        self._total_length += length
+
+    def _remove_memory(self, chunk_id: str):
+        if chunk_id not in self._lengths:
+            return
+        text = self.get_texts([chunk_id]).get(chunk_id, "")
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+        self._doc_of.pop(chunk_id, None)
+
+    # ---- public API ----
+    def upsert(self, doc_id: str, chunk_ids: List[str], texts: List[str]):
+        with self._lock:
+            for chunk_id, text in zip(chunk_ids, texts):
+                self._add_memory(chunk_id, doc_id, text)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, doc_id, text) VALUES (?, ?, ?)",
+                [(cid, doc_id, text) for cid, text in zip(chunk_ids, texts)]
+            )
+            self._conn.commit()
+
+    def delete(self, chunk_ids: Iterable[str]):
+        chunk_ids = list(chunk_ids)
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove_memory(chunk_id)
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(c,) for c in chunk_ids])
+            self._conn.commit()
+
+    def get_texts(self, chunk_ids: List[str]) -> Dict[str, str]:
+        with self._lock:
+            rows = []
+            for start in range(0, len(chunk_ids), 500):
+                part = chunk_ids[start:start + 500]
+                rows.extend(self._conn.execute(
+                    f"SELECT chunk_id, text FROM chunks WHERE chunk_id IN ({','.join('?' * len(part))})", part
+                ).fetchall())
+        return dict(rows)
+
+    def doc_of(self, chunk_id: str) -> Optional[str]:
+        return self._doc_of.get(chunk_id)
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        doc_ids: Optional[List[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, BM25 score), optionally restricted to `doc_ids`."""
+        allowed = set(doc_ids) if doc_ids else None
+        with self._lock:
+            n = len(self._lengths)
+            if not n:
+                return []
+            avg_len = self._total_length / n
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    if allowed is not None and self._doc_of.get(chunk_id) not in allowed:
+                        continue
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[chunk_id] / avg_len)
+                    scores[chunk_id] += idf * tf * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+
+_indexes: Dict[str, LexicalIndex] = {}
+_index_lock = threading.Lock()
+
+
+def get_lexical_index(owner: str = DEFAULT_OWNER) -> LexicalIndex:
+    """One index per owner partition; backfilled from Chroma the first time it is found empty."""
+    with _index_lock:
+        index = _indexes.get(owner)
+        if index is None:
+            index = _indexes[owner] = LexicalIndex(partition_path(LEXICAL_INDEX_PATH, owner))
+            if not len(index):
+                _backfill_from_chroma(index, owner)
+    return index
+
+
+def _backfill_from_chroma(index: LexicalIndex, owner: str, page_size: int = 1000):
+    from app.services.store_manager import store_manager
+    try:
+        collection = store_manager.get_vectordb(owner)._collection
+        offset = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                break
+            by_doc = defaultdict(lambda: ([], []))
+            for cid, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                ids, texts = by_doc[(meta or {}).get("doc_id", "")]
+                ids.append(cid)
+                texts.append(text or "")
+            for doc_id, (ids, texts) in by_doc.items():
+                index.upsert(doc_id, ids, texts)
+            offset += len(page["ids"])
+        if len(index):
+            logger.info(f"🔎 Lexical index backfilled with {len(index)} chunks from Chroma")
+    except Exception as e:
+        logger.error(f"❌ Lexical index backfill failed: {e}")
@@ -0,0 +1,106 @@
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+LOCAL_EMBEDDING_MODEL_DIR = os.getenv("LOCAL_EMBEDDING_MODEL_DIR", "./models/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_QUANTIZED = os.getenv("LOCAL_EMBEDDING_QUANTIZED", "false").lower() == "true"
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))  # 0 → onnxruntime default
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_MAX_LENGTH = int(os.getenv("LOCAL_EMBEDDING_MAX_LENGTH", "256"))
+
+# Layouts used by sentence-transformers ONNX exports on the HF hub
+_MODEL_FILES = ["model.onnx", "onnx/model.onnx"]
+_QUANTIZED_FILES = ["model_quantized.onnx", "onnx/model_quantized.onnx", "onnx/model_qint8_avx2.onnx"]
+
+
+def find_model_file(model_dir: Path, quantized: bool) -> Path:
+    candidates = (_QUANTIZED_FILES if quantized else []) + _MODEL_FILES
+    for name in candidates:
+        path = model_dir / name
+        if path.exists():
+            if quantized and name in _MODEL_FILES:
+                logger.warning(f"⚠️ No quantized model in {model_dir}, using {name}")
+            return path
+    raise FileNotFoundError(f"No ONNX model found in {model_dir} (looked for {candidates})")
+
+
+# -----------------------------
+# Local ONNX sentence embeddings (CPU)
+# -----------------------------
+class LocalOnnxEmbeddings(Embeddings):
+    """
+    Runs a sentence-transformers model (MiniLM by default) exported to ONNX
+    on CPU: tokenizer.json + model.onnx loaded from a local directory, so it
+    works offline. Texts are sorted by length and padded per batch, then
+    mean-pooled and L2-normalized like sentence-transformers does.
+    """
+
+    def __init__(
+        self,
+        model_dir: str = LOCAL_EMBEDDING_MODEL_DIR,
+        quantized: bool = LOCAL_EMBEDDING_QUANTIZED,
+        num_threads: int = LOCAL_EMBEDDING_THREADS,
+        batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+        max_length: int = LOCAL_EMBEDDING_MAX_LENGTH,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = Path(model_dir)
+        self.model_file = find_model_file(model_path, quantized)
+        self.batch_size = max(1, batch_size)
+
+        self.tokenizer = Tokenizer.from_file(str(model_path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()  # pads to the longest text in each batch
+
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(self.model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        # onnxruntime sessions are thread-safe, but one run at a time keeps
+        # the configured thread count from being oversubscribed
+        self._lock = threading.Lock()
+        logger.info(f"🧠 Local ONNX embeddings loaded from {self.model_file} (threads={num_threads or 'auto'})")
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        with self._lock:
+            hidden = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Length-sorted batches → little padding waste
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            for i, vec in zip(idx, self._embed_batch([texts[i] for i in idx])):
+                vectors[i] = vec.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,228 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# OTLP spans are exported only when an endpoint is configured (standard OTel env var)
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "documind-backend")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# -----------------------------
+# Prometheus-style metrics (text exposition, no extra dependency)
+# -----------------------------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labelnames: Sequence[str], values: Tuple[str, ...], le: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """label values → (count, sum) so far."""
+        with self._lock:
+            return {key: (series[-1], series[-2]) for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, str(bound))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, '+Inf')} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Stages: drive_fetch, parse, chunk, embed, upsert, embed_query, retrieve, rerank, prompt_build, generate
+STAGE_SECONDS = registry.histogram(
+    "documind_stage_seconds", "Latency of ingestion and query stages", ["stage"]
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "documind_http_request_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+CACHE_LOOKUPS = registry.counter(
+    "documind_cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+)
+CHUNKS = registry.counter(
+    "documind_chunks_total", "Chunks by operation (created/embedded/deleted)", ["op"]
+)
+TOKENS = registry.counter(
+    "documind_tokens_total", "Tokens by kind (embedded/context/prompt/completion)", ["kind"]
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "documind_upstream_requests_total",
+    "HF endpoint attempts by outcome (requests/succeeded/failed/retries/hedges/hedge_wins/rejected)",
+    ["endpoint", "outcome"]
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "documind_upstream_seconds", "Latency of single HF endpoint attempts", ["endpoint"]
+)
+STAGE_ERRORS = registry.counter(
+    "documind_stage_errors_total", "Exceptions raised inside an instrumented stage", ["stage"]
+)
+
+
+# -----------------------------
+# Optional OTLP tracing
+# -----------------------------
+_tracer = None
+_tracer_loaded = False
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """OTel tracer exporting over OTLP when OTEL_EXPORTER_OTLP_ENDPOINT is set, else None."""
+    global _tracer, _tracer_loaded
+    if _tracer_loaded or not OTLP_ENDPOINT:
+        return _tracer
+    with _tracer_lock:
+        if not _tracer_loaded:
+            _tracer_loaded = True
+            try:
+                from opentelemetry import trace
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+                provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                trace.set_tracer_provider(provider)
+                _tracer = trace.get_tracer("documind")
+                logger.info(f"📡 OTLP tracing enabled → {OTLP_ENDPOINT}")
+            except Exception as e:
+                logger.warning(f"⚠️ OTLP tracing unavailable: {e}")
+    return _tracer
+
+
+@contextmanager
+def timed(stage: str, **attributes) -> Iterator[None]:
+    """Observe the block's latency in STAGE_SECONDS and, if tracing is on, wrap it in a span."""
+    tracer = get_tracer()
+    with ExitStack() as stack:
+        if tracer is not None:
+            # The span records the exception itself when one escapes
+            stack.enter_context(tracer.start_as_current_span(stage, attributes=attributes))
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            STAGE_ERRORS.inc(stage=stage)
+            raise
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage measured elsewhere (e.g. across a generator)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+def count_cache(cache: str, hit: bool, amount: int = 1):
+    if amount:
+        CACHE_LOOKUPS.inc(amount, cache=cache, result="hit" if hit else "miss")
+
+
+def count_chunks(op: str, amount: int):
+    if amount:
+        CHUNKS.inc(amount, op=op)
+
+
+def count_tokens_used(kind: str, amount: int):
+    if amount:
+        TOKENS.inc(amount, kind=kind)
+
+
+def route_template(scope: dict) -> Optional[str]:
+    route = scope.get("route")
+    return getattr(route, "path", None)
@@ -0,0 +1,143 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OWNER = os.getenv("DEFAULT_OWNER", "user")
+# Google user id that inherits the data indexed before per-user partitions
+# (the old shared "user" partition); unset → that data is unused, re-ingest
+LEGACY_DATA_OWNER = os.getenv("LEGACY_DATA_OWNER") or None
+EXACT_SEARCH_MAX_CHUNKS = int(os.getenv("EXACT_SEARCH_MAX_CHUNKS", "5000"))
+DOC_VECTOR_CACHE_DOCS = int(os.getenv("DOC_VECTOR_CACHE_DOCS", "256"))
+
+
+# -----------------------------
+# Owner partitions
+# -----------------------------
+def owner_slug(owner: str) -> str:
+    """Filesystem/collection-safe, stable name for an owner id."""
+    clean = re.sub(r"[^A-Za-z0-9_-]", "", owner)[:32]
+    digest = hashlib.sha1(owner.encode("utf-8")).hexdigest()[:8]
+    return f"{clean}-{digest}" if clean else digest
+
+
+def is_legacy_partition(owner: str) -> bool:
+    """The default owner, and LEGACY_DATA_OWNER if set, use the pre-partition files/collection."""
+    return owner == DEFAULT_OWNER or (LEGACY_DATA_OWNER is not None and owner == LEGACY_DATA_OWNER)
+
+
+def partition_path(base_path: str, owner: str) -> str:
+    """Per-owner copy of a SQLite file; the legacy partition keeps `base_path` (existing data)."""
+    if is_legacy_partition(owner):
+        return base_path
+    base = Path(base_path)
+    return str(base.parent / "owners" / owner_slug(owner) / base.name)
+
+
+# -----------------------------
+# Exact search over selected docs
+# -----------------------------
+class _DocVectors:
+    def __init__(self, ids: List[str], texts: List[str], metadatas: List[dict], embeddings):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.clip(norms, 1e-12, None)
+
+
+class DocVectorCache:
+    """
+    LRU of per-doc (chunk ids, texts, normalized embedding matrix), loaded
+    from Chroma by chunk id via the manifest's doc→chunk index. Invalidated
+    per doc by apply_doc_update.
+    """
+
+    def __init__(self, max_docs: int = DOC_VECTOR_CACHE_DOCS):
+        self.max_docs = max_docs
+        self._docs: "OrderedDict[Tuple[str, str], _DocVectors]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, owner: str, doc_id: str, collection, chunk_ids: List[str]) -> Optional[_DocVectors]:
+        key = (owner, doc_id)
+        with self._lock:
+            cached = self._docs.get(key)
+            if cached is not None:
+                self._docs.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        if not chunk_ids:
+            return None
+        result = collection.get(ids=chunk_ids, include=["embeddings", "documents", "metadatas"])
+        if not len(result["ids"]):
+            return None
+        vectors = _DocVectors(result["ids"], result["documents"], result["metadatas"], result["embeddings"])
+        with self._lock:
+            self._docs[key] = vectors
+            while len(self._docs) > self.max_docs:
+                self._docs.popitem(last=False)
+        return vectors
+
+    def invalidate(self, owner: str, doc_id: str):
+        with self._lock:
+            self._docs.pop((owner, doc_id), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"docs": len(self._docs), "hits": self.hits, "misses": self.misses}
+
+
+doc_vector_cache = DocVectorCache()
+
+
+def exact_search(
+    owner: str,
+    collection,
+    manifest,
+    query_embedding: List[float],
+    doc_ids: List[str],
+    k: int
+) -> Optional[List[Document]]:
+    """
+    Brute-force cosine top-k over exactly the selected docs' chunks. Returns
+    None when the selection is too large (caller falls back to HNSW + filter).
+    """
+    chunk_ids = {doc_id: manifest.get_chunk_ids(doc_id) for doc_id in doc_ids}
+    if any(not ids and not manifest.has_doc(doc_id) for doc_id, ids in chunk_ids.items()):
+        return None  # indexed before the manifest existed → only Chroma knows its chunks
+    total = sum(len(ids) for ids in chunk_ids.values())
+    if total == 0:
+        return []
+    if total > EXACT_SEARCH_MAX_CHUNKS:
+        return None
+
+    parts = [doc_vector_cache.get(owner, doc_id, collection, ids) for doc_id, ids in chunk_ids.items()]
+    parts = [p for p in parts if p is not None]
+    if not parts:
+        return None
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    scores = np.concatenate([p.matrix @ query for p in parts])
+    rows = [(p, i) for p in parts for i in range(len(p.ids))]
+    docs = []
+    for row in np.argsort(-scores)[:k]:
+        part, i = rows[row]
+        docs.append(Document(
+            page_content=part.texts[i] or "",
+            metadata={**(part.metadatas[i] or {}), "chunk_id": part.ids[i]}
+        ))
+    return docs
@@ -0,0 +1,97 @@
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from app.services.local_embeddings import find_model_file
+
+logger = logging.getLogger(__name__)
+
+RERANKER_ENABLED = os.getenv("RERANKER_ENABLED", "false").lower() == "true"
+RERANKER_MODEL_DIR = os.getenv("RERANKER_MODEL_DIR", "./models/ms-marco-MiniLM-L-6-v2")
+RERANKER_QUANTIZED = os.getenv("RERANKER_QUANTIZED", "false").lower() == "true"
+RERANKER_THREADS = int(os.getenv("RERANKER_THREADS", "0"))  # 0 → onnxruntime default
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", "16"))
+RERANKER_MAX_LENGTH = int(os.getenv("RERANKER_MAX_LENGTH", "256"))
+
+
+# -----------------------------
+# Local ONNX cross-encoder (CPU)
+# -----------------------------
+class LocalOnnxCrossEncoder:
+    """
+    Scores (question, passage) pairs with a cross-encoder exported to ONNX
+    (ms-marco MiniLM by default), loaded from a local directory the same way
+    LocalOnnxEmbeddings loads its model. Higher score = more relevant.
+    """
+
+    def __init__(
+        self,
+        model_dir: str = RERANKER_MODEL_DIR,
+        quantized: bool = RERANKER_QUANTIZED,
+        num_threads: int = RERANKER_THREADS,
+        batch_size: int = RERANKER_BATCH_SIZE,
+        max_length: int = RERANKER_MAX_LENGTH,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = Path(model_dir)
+        self.model_file = find_model_file(model_path, quantized)
+        self.batch_size = max(1, batch_size)
+
+        self.tokenizer = Tokenizer.from_file(str(model_path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(self.model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._lock = threading.Lock()
+        logger.info(f"🧠 Local ONNX reranker loaded from {self.model_file} (threads={num_threads or 'auto'})")
+
+    def _score_batch(self, question: str, passages: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch([(question, p) for p in passages])
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        with self._lock:
+            logits = self.session.run(None, feeds)[0]  # (batch, 1) or (batch, 2)
+        return logits[:, -1] if logits.ndim == 2 else logits
+
+    def score(self, question: str, passages: List[str]) -> List[float]:
+        scores: List[float] = []
+        for start in range(0, len(passages), self.batch_size):
+            scores.extend(self._score_batch(question, passages[start:start + self.batch_size]).tolist())
+        return scores
+
+
+_reranker = None
+_reranker_loaded = False
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[LocalOnnxCrossEncoder]:
+    """Shared cross-encoder, or None when disabled or the model can't be loaded."""
+    global _reranker, _reranker_loaded
+    with _reranker_lock:
+        if not _reranker_loaded:
+            _reranker_loaded = True
+            if RERANKER_ENABLED:
+                try:
+                    _reranker = LocalOnnxCrossEncoder()
+                except Exception as e:
+                    logger.warning(f"⚠️ Reranker unavailable, keeping retrieval order: {e}")
+    return _reranker
@@ -0,0 +1,244 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.services.executor import run_blocking
+from app.services.lexical_index import get_lexical_index
+from app.services.index_manifest import get_manifest
+from app.services.partitions import DEFAULT_OWNER, exact_search
+from app.services.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # vector | lexical | hybrid
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_FETCH_MULTIPLIER = int(os.getenv("HYBRID_FETCH_MULTIPLIER", "3"))
+
+MODES = ("vector", "lexical", "hybrid")
+
+# Sync callers (ask_doc_runnable, streaming) run both searches side by side here
+_search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
+
+
+# -----------------------------
+# Single retrievers
+# -----------------------------
+def _to_documents(ids, texts, metadatas) -> List[Document]:
+    return [
+        Document(page_content=text or "", metadata={**(meta or {}), "chunk_id": chunk_id})
+        for chunk_id, text, meta in zip(ids, texts, metadatas)
+    ]
+
+
+def vector_search_many(
+    db,
+    query_embeddings: List[List[float]],
+    selected_doc_ids: Optional[List[str]],
+    k: int,
+    owner: str = DEFAULT_OWNER
+) -> List[List[Document]]:
+    """
+    One result list per embedding. Selected docs are searched exactly over
+    their own chunks (doc→chunk index); otherwise every question goes to
+    Chroma in a single HNSW query (with a `$in` filter for very large
+    selections). Chunk ids are kept in metadata so results can be fused.
+    """
+    if not query_embeddings:
+        return []
+    if selected_doc_ids:
+        manifest = get_manifest(owner)
+        results = []
+        for query_embedding in query_embeddings:
+            docs = exact_search(owner, db._collection, manifest, query_embedding, selected_doc_ids, k)
+            if docs is None:
+                break  # same selection → same answer for every question
+            results.append(docs)
+        else:
+            return results
+    kwargs = {"query_embeddings": list(query_embeddings), "n_results": k, "include": ["documents", "metadatas"]}
+    if selected_doc_ids:
+        kwargs["where"] = {"doc_id": {"$in": selected_doc_ids}}
+    result = db._collection.query(**kwargs)
+    return [
+        _to_documents(ids, texts, metadatas)
+        for ids, texts, metadatas in zip(result["ids"], result["documents"], result["metadatas"])
+    ]
+
+
+def vector_search(
+    db,
+    query_embedding: List[float],
+    selected_doc_ids: Optional[List[str]],
+    k: int,
+    owner: str = DEFAULT_OWNER
+) -> List[Document]:
+    return vector_search_many(db, [query_embedding], selected_doc_ids, k, owner)[0]
+
+
+def lexical_search(
+    question: str,
+    selected_doc_ids: Optional[List[str]],
+    k: int,
+    owner: str = DEFAULT_OWNER
+) -> List[Document]:
+    index = get_lexical_index(owner)
+    hits = index.search(question, k=k, doc_ids=selected_doc_ids)
+    texts = index.get_texts([chunk_id for chunk_id, _ in hits])
+    return [
+        Document(
+            page_content=texts.get(chunk_id, ""),
+            metadata={"doc_id": index.doc_of(chunk_id), "chunk_id": chunk_id, "bm25": round(score, 4)}
+        )
+        for chunk_id, score in hits
+    ]
+
+
+# -----------------------------
+# Reciprocal rank fusion
+# -----------------------------
+def rrf_fuse(result_lists: List[List[Document]], k: int = RRF_K, top_k: Optional[int] = None) -> List[Document]:
+    """score(d) = Σ 1 / (k + rank); ties keep the order of the first list."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            chunk_id = doc.metadata.get("chunk_id") or doc.page_content
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            # Prefer the vector copy: it carries the full Chroma metadata
+            docs.setdefault(chunk_id, doc)
+    fused = sorted(scores, key=lambda cid: scores[cid], reverse=True)
+    return [docs[cid] for cid in fused[:top_k]]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def _observe(timings: Dict[str, float]):
+    # retrieval_ms → stage "retrieve", vector_ms → "retrieve_vector", ...
+    for name, ms in timings.items():
+        stage = "retrieve" if name == "retrieval_ms" else "retrieve_" + name[:-3]
+        observe_stage(stage, ms / 1000)
+
+
+# -----------------------------
+# Entry points
+# -----------------------------
+def retrieve(
+    db,
+    question: str,
+    query_embedding: List[float],
+    selected_doc_ids: Optional[List[str]],
+    top_k: int,
+    mode: Optional[str] = None,
+    owner: str = DEFAULT_OWNER
+) -> Tuple[List[Document], Dict[str, float]]:
+    """Returns (top_k documents, per-stage latency in ms)."""
+    mode = mode or RETRIEVAL_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}' (expected one of {MODES})")
+    started = time.perf_counter()
+
+    if mode == "vector":
+        docs, vector_s = _timed(vector_search, db, query_embedding, selected_doc_ids, top_k, owner)
+        timings = {"vector_ms": _ms(vector_s)}
+    elif mode == "lexical":
+        docs, lexical_s = _timed(lexical_search, question, selected_doc_ids, top_k, owner)
+        timings = {"lexical_ms": _ms(lexical_s)}
+    else:
+        fetch_k = top_k * HYBRID_FETCH_MULTIPLIER
+        vector_future = _search_pool.submit(_timed, vector_search, db, query_embedding, selected_doc_ids, fetch_k, owner)
+        lexical_future = _search_pool.submit(_timed, lexical_search, question, selected_doc_ids, fetch_k, owner)
+        vector_docs, vector_s = vector_future.result()
+        lexical_docs, lexical_s = lexical_future.result()
+        docs, fusion_s = _timed(lambda: rrf_fuse([vector_docs, lexical_docs], top_k=top_k))
+        timings = {"vector_ms": _ms(vector_s), "lexical_ms": _ms(lexical_s), "fusion_ms": _ms(fusion_s)}
+
+    timings["retrieval_ms"] = _ms(time.perf_counter() - started)
+    _observe(timings)
+    logger.info(f"🔍 Retrieval ({mode}): {len(docs)} chunks, {timings}")
+    return docs, timings
+
+
+def retrieve_many(
+    db,
+    questions: List[str],
+    query_embeddings: List[List[float]],
+    selected_doc_ids: Optional[List[str]],
+    top_k: int,
+    mode: Optional[str] = None,
+    owner: str = DEFAULT_OWNER
+) -> Tuple[List[List[Document]], Dict[str, float]]:
+    """Batch form of retrieve: all vector searches go out as one Chroma query."""
+    mode = mode or RETRIEVAL_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}' (expected one of {MODES})")
+    started = time.perf_counter()
+
+    def lexical_many(k: int) -> List[List[Document]]:
+        return [lexical_search(q, selected_doc_ids, k, owner) for q in questions]
+
+    if mode == "vector":
+        results, vector_s = _timed(vector_search_many, db, query_embeddings, selected_doc_ids, top_k, owner)
+        timings = {"vector_ms": _ms(vector_s)}
+    elif mode == "lexical":
+        results, lexical_s = _timed(lexical_many, top_k)
+        timings = {"lexical_ms": _ms(lexical_s)}
+    else:
+        fetch_k = top_k * HYBRID_FETCH_MULTIPLIER
+        vector_future = _search_pool.submit(_timed, vector_search_many, db, query_embeddings, selected_doc_ids, fetch_k, owner)
+        lexical_future = _search_pool.submit(_timed, lexical_many, fetch_k)
+        vector_results, vector_s = vector_future.result()
+        lexical_results, lexical_s = lexical_future.result()
+        results, fusion_s = _timed(lambda: [
+            rrf_fuse([v, l], top_k=top_k) for v, l in zip(vector_results, lexical_results)
+        ])
+        timings = {"vector_ms": _ms(vector_s), "lexical_ms": _ms(lexical_s), "fusion_ms": _ms(fusion_s)}
+
+    timings["retrieval_ms"] = _ms(time.perf_counter() - started)
+    observe_stage("retrieve_batch", timings["retrieval_ms"] / 1000)
+    logger.info(f"🔍 Batch retrieval ({mode}): {len(questions)} questions, {timings}")
+    return results, timings
+
+
+async def aretrieve(
+    db,
+    question: str,
+    query_embedding: List[float],
+    selected_doc_ids: Optional[List[str]],
+    top_k: int,
+    mode: Optional[str] = None,
+    owner: str = DEFAULT_OWNER
+) -> Tuple[List[Document], Dict[str, float]]:
+    """Async twin of retrieve; both searches run on the blocking executor."""
+    mode = mode or RETRIEVAL_MODE
+    if mode != "hybrid":
+        return await run_blocking(retrieve, db, question, query_embedding, selected_doc_ids, top_k, mode, owner)
+
+    started = time.perf_counter()
+    fetch_k = top_k * HYBRID_FETCH_MULTIPLIER
+    (vector_docs, vector_s), (lexical_docs, lexical_s) = await asyncio.gather(
+        run_blocking(_timed, vector_search, db, query_embedding, selected_doc_ids, fetch_k, owner),
+        run_blocking(_timed, lexical_search, question, selected_doc_ids, fetch_k, owner),
+    )
+    docs, fusion_s = _timed(lambda: rrf_fuse([vector_docs, lexical_docs], top_k=top_k))
+    timings = {
+        "vector_ms": _ms(vector_s),
+        "lexical_ms": _ms(lexical_s),
+        "fusion_ms": _ms(fusion_s),
+        "retrieval_ms": _ms(time.perf_counter() - started),
+    }
+    _observe(timings)
+    logger.info(f"🔍 Retrieval (hybrid): {len(docs)} chunks, {timings}")
+    return docs, timings
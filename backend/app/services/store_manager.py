@@ -0,0 +1,170 @@
+import os
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from langchain_community.vectorstores import Chroma
+
+from app.services.embedding_service import get_embeddings
+from app.services.partitions import DEFAULT_OWNER, LEGACY_DATA_OWNER, is_legacy_partition, owner_slug
+
+logger = logging.getLogger(__name__)
+
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+# The legacy partition (default owner / LEGACY_DATA_OWNER) keeps LangChain's default collection
+DEFAULT_COLLECTION = "langchain"
+
+
+def collection_name(owner: str) -> str:
+    return DEFAULT_COLLECTION if is_legacy_partition(owner) else f"owner_{owner_slug(owner)}"
+
+
+# -----------------------------
+# One Chroma client per process
+# -----------------------------
+class StoreManager:
+    """
+    Owns the single Chroma client shared by ingestion and queries, so both
+    sides see the same collection (no second client on the same SQLite/HNSW
+    files, no restart needed to see newly ingested chunks).
+    Each owner gets its own collection (own HNSW index), so one user's
+    queries never search or filter through another user's chunks.
+    """
+
+    def __init__(self, persist_dir: str = CHROMA_PERSIST_DIR):
+        self.persist_dir = persist_dir
+        self._client = None
+        self._stores: Dict[str, Chroma] = {}
+        self._lock = threading.Lock()
+        self._warmed: Set[str] = set()
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def _open_client(self):
+        # Caller holds self._lock
+        if self._client is None:
+            import chromadb
+            Path(self.persist_dir).mkdir(parents=True, exist_ok=True)
+            self._client = chromadb.PersistentClient(path=self.persist_dir)
+            logger.info(f"📦 Chroma DB opened at {self.persist_dir}")
+        return self._client
+
+    def get_vectordb(self, owner: str = DEFAULT_OWNER) -> Chroma:
+        vectordb = self._stores.get(owner)
+        if vectordb is None:
+            embedding_fn = get_embeddings()
+            with self._lock:
+                client = self._open_client()
+                vectordb = self._stores.get(owner)
+                if vectordb is None:
+                    vectordb = Chroma(
+                        client=client,
+                        collection_name=collection_name(owner),
+                        embedding_function=embedding_fn,
+                        # Collection names are slugs; the metadata maps them back to owners
+                        collection_metadata={"owner": owner}
+                    )
+                    self._stores[owner] = vectordb
+        return vectordb
+
+    def owners(self) -> List[str]:
+        """Owners that have a collection on disk."""
+        with self._lock:
+            collections = self._open_client().list_collections()
+        owners = []
+        for collection in collections:
+            if collection.name == DEFAULT_COLLECTION:
+                owners.append(LEGACY_DATA_OWNER or DEFAULT_OWNER)
+            elif (collection.metadata or {}).get("owner"):
+                owners.append(collection.metadata["owner"])
+        return owners
+
+    def count(self, owner: str = DEFAULT_OWNER) -> int:
+        return self.get_vectordb(owner)._collection.count()
+
+    def is_empty(self, owner: str = DEFAULT_OWNER) -> bool:
+        return self.count(owner) == 0
+
+    def warm_owner(self, owner: str) -> int:
+        """Load an owner's HNSW segment and BM25 index so their first query doesn't pay for it."""
+        from app.services.lexical_index import get_lexical_index
+        vectordb = self.get_vectordb(owner)
+        count = vectordb._collection.count()
+        if count:
+            sample = vectordb._collection.get(limit=1, include=["embeddings"])
+            vectordb._collection.query(query_embeddings=[list(sample["embeddings"][0])], n_results=1)
+            get_lexical_index(owner)  # loads (or backfills) the owner's BM25 index
+        self._warmed.add(owner)
+        return count
+
+    def warm_owner_in_background(self, owner: str):
+        """Off the request path (e.g. right after login); no-op once the owner is warm."""
+        if owner in self._warmed:
+            return
+        self._warmed.add(owner)
+        threading.Thread(target=self._warm_quietly, args=(owner,), name="store-warmup-owner", daemon=True).start()
+
+    def _warm_quietly(self, owner: str):
+        try:
+            self.warm_owner(owner)
+        except Exception as e:
+            self._warmed.discard(owner)
+            logger.warning(f"⚠️ Warm-up failed for '{owner}': {e}")
+
+    def warm_up(self):
+        """Open the client and build the embedder, then warm every owner's collection before the first query."""
+        started = time.perf_counter()
+        try:
+            owners = self.owners()
+            self.get_vectordb()
+            self.ready = True
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"❌ Vector store warm-up failed: {e}")
+            return
+        chunks = 0
+        for owner in owners:
+            if owner == DEFAULT_OWNER:
+                # Requests are keyed by Google user id, so nobody reads the old shared partition
+                legacy = self.count(owner)
+                if legacy:
+                    logger.warning(
+                        f"⚠️ {legacy} chunks indexed before per-user partitions are not visible to anyone: "
+                        "set LEGACY_DATA_OWNER=<Google user id> to hand them to one user, or re-ingest"
+                    )
+                continue
+            try:
+                chunks += self.warm_owner(owner)
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up failed for '{owner}': {e}")
+        self.warmup_seconds = time.perf_counter() - started
+        logger.info(f"🔥 Vector store warmed up in {self.warmup_seconds:.2f}s ({len(owners)} owners, {chunks} chunks)")
+
+    def total_chunks(self) -> int:
+        return sum(db._collection.count() for db in list(self._stores.values()))
+
+    def status(self) -> dict:
+        status = {
+            "ready": self.ready,
+            "persist_dir": self.persist_dir,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "error": self.error,
+        }
+        if self._stores:
+            try:
+                status["owners"] = len(self._stores)
+                status["chunks"] = self.total_chunks()
+            except Exception as e:
+                status["error"] = str(e)
+        return status
+
+
+store_manager = StoreManager()
+
+
+def get_vectordb(owner: str = DEFAULT_OWNER) -> Chroma:
+    return store_manager.get_vectordb(owner)
@@ -1,113 +1,196 @@
-import os
 import logging
 import hashlib
-from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple, Union
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+from app.services.embedding_service import get_embeddings
+from app.services.store_manager import store_manager
+from app.services.chunking import Chunk, chunk_document
+from app.services.doc_parser import ParsedDoc
+from app.services.index_manifest import get_manifest
+from app.services.answer_cache import answer_cache
+from app.services.lexical_index import get_lexical_index
+from app.services.partitions import DEFAULT_OWNER, doc_vector_cache
+from app.services.metrics import timed, count_chunks, count_tokens_used
 
 logger = logging.getLogger(__name__)
 
 # -----------------------------
-# Hugging Face Endpoint embeddings (lazy-loaded)
+# Embeddings (shared, micro-batched HF endpoint)
 # -----------------------------
-HF_TOKEN = os.getenv("HF_TOKEN")  # make sure set in Render
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-
-_embeddings_model = None  # lazy-loaded
+def get_embeddings_model():
+    return get_embeddings()
 
 
-def get_embeddings_model():
-    global _embeddings_model
-    if _embeddings_model is None:
-        _embeddings_model = HuggingFaceEndpointEmbeddings(
-            model=EMBEDDING_MODEL,
-            task="feature-extraction",      # embeddings ke liye zaroori
-            huggingfacehub_api_token=HF_TOKEN
-        )
-        logger.info(f"🌐 Hugging Face Endpoint embeddings model '{EMBEDDING_MODEL}' initialized.")
-    return _embeddings_model
+# -----------------------------
+# Vector store (shared process-wide client, one collection per owner)
+# -----------------------------
+def get_vectordb(owner: str = DEFAULT_OWNER) -> Chroma:
+    return store_manager.get_vectordb(owner)
 
 
 # -----------------------------
-# Vector store (lazy-loaded)
+# Ingestion building blocks (chunk IDs → diff → embed → upsert)
 # -----------------------------
-_vectordb = None
+def make_chunk_ids(doc_id: str, chunks: List[Chunk]) -> Tuple[List[Chunk], List[str]]:
+    """
+    Content-addressed chunk IDs: an edit only changes the IDs of the chunks it
+    touches. Repeated chunks within one doc are stored once.
+    Returns (deduplicated chunks, chunk IDs).
+    """
+    unique_chunks, chunk_ids, seen = [], [], set()
+    for chunk in chunks:
+        chunk_id = f"{doc_id}_{hashlib.sha256(chunk.text.encode('utf-8')).hexdigest()[:16]}"
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        unique_chunks.append(chunk)
+        chunk_ids.append(chunk_id)
+    return unique_chunks, chunk_ids
+
+
+def _chunk_metadata(doc_id: str, chunk: Chunk) -> dict:
+    return {
+        "doc_id": doc_id,
+        "heading": " > ".join(chunk.heading_path),
+        "start": chunk.start,
+        "end": chunk.end,
+        "tokens": chunk.token_count,
+    }
+
+
+def _stored_chunk_ids(doc_id: str, owner: str = DEFAULT_OWNER) -> List[str]:
+    manifest = get_manifest(owner)
+    if manifest.has_doc(doc_id):
+        return manifest.get_chunk_ids(doc_id)
+    # Not in the manifest yet (e.g. indexed with positional IDs) → ask Chroma
+    try:
+        return get_vectordb(owner).get(where={"doc_id": doc_id}, include=[])["ids"]
+    except Exception as e:
+        logger.debug(f"No existing chunks found for '{doc_id}': {e}")
+        return []
 
 
-def get_vectordb(persist_dir: str = "./chroma_db") -> Optional[Chroma]:
-    global _vectordb
-    if _vectordb is None:
-        persist_path = Path(persist_dir)
-        if persist_path.exists() and any(persist_path.iterdir()):
-            _vectordb = Chroma(
-                persist_directory=persist_dir,
-                embedding_function=get_embeddings_model()
+def plan_doc_update(
+    doc_id: str,
+    chunk_ids: List[str],
+    owner: str = DEFAULT_OWNER
+) -> Tuple[List[int], List[str]]:
+    """Diff new chunk IDs against the index → (indices to embed, IDs to delete)."""
+    stored = set(_stored_chunk_ids(doc_id, owner))
+    new_ids = set(chunk_ids)
+    to_add = [i for i, cid in enumerate(chunk_ids) if cid not in stored]
+    to_remove = [cid for cid in stored if cid not in new_ids]
+    return to_add, to_remove
+
+
+def embed_chunks(chunks: List[Chunk]) -> List[List[float]]:
+    """Embed chunk texts via the configured embeddings model."""
+    with timed("embed", chunks=len(chunks)):
+        embeddings = get_embeddings_model().embed_documents([c.text for c in chunks])
+    count_chunks("embedded", len(chunks))
+    count_tokens_used("embedded", sum(c.token_count for c in chunks))
+    return embeddings
+
+
+def upsert_chunks(
+    doc_id: str,
+    chunks: List[Chunk],
+    embeddings: List[List[float]],
+    chunk_ids: List[str],
+    owner: str = DEFAULT_OWNER
+) -> Chroma:
+    """Write pre-computed chunk embeddings into the owner's Chroma collection."""
+    vectordb = get_vectordb(owner)
+    try:
+        with timed("upsert", chunks=len(chunks)):
+            vectordb._collection.upsert(
+                ids=chunk_ids,
+                embeddings=embeddings,
+                documents=[c.text for c in chunks],
+                metadatas=[_chunk_metadata(doc_id, c) for c in chunks]
             )
-            logger.info(f"📦 Chroma DB loaded from {persist_dir}")
-        else:
-            logger.warning(f"⚠️ No existing data in {persist_dir}")
-    return _vectordb
+            vectordb.persist()
+    except Exception as e:
+        logger.error(f"❌ Failed to upsert chunks for doc '{doc_id}': {e}")
+        raise
+    return vectordb
+
+
+def apply_doc_update(
+    doc_id: str,
+    chunks: List[Chunk],
+    chunk_ids: List[str],
+    add_indices: List[int],
+    embeddings: List[List[float]],
+    removed_ids: List[str],
+    version: Optional[str] = None,
+    owner: str = DEFAULT_OWNER
+) -> Chroma:
+    """
+    Upsert added chunks, delete removed ones, then record the doc in the
+    manifest. The BM25 lexical index is kept in step with Chroma.
+    """
+    vectordb = get_vectordb(owner)
+    if add_indices:
+        upsert_chunks(
+            doc_id,
+            [chunks[i] for i in add_indices],
+            embeddings,
+            [chunk_ids[i] for i in add_indices],
+            owner
+        )
+    if removed_ids:
+        count_chunks("deleted", len(removed_ids))
+        try:
+            vectordb.delete(ids=removed_ids)
+        except Exception as e:
+            logger.error(f"❌ Failed to delete stale chunks for doc '{doc_id}': {e}")
+            raise
+    if add_indices or removed_ids:
+        lexical = get_lexical_index(owner)
+        lexical.upsert(doc_id, [chunk_ids[i] for i in add_indices], [chunks[i].text for i in add_indices])
+        lexical.delete(removed_ids)
+    get_manifest(owner).record(doc_id, chunk_ids, version)
+    if add_indices or removed_ids:
+        doc_vector_cache.invalidate(owner, doc_id)
+        answer_cache.invalidate_docs([doc_id], owner)
+    logger.info(
+        f"✅ Document '{doc_id}' indexed: {len(add_indices)} added, "
+        f"{len(removed_ids)} removed, {len(chunk_ids) - len(add_indices)} unchanged."
+    )
+    return vectordb
 
 
 # -----------------------------
 # Create/update vector store from text
 # -----------------------------
 def create_vector_store_from_text(
-    content: str,
+    content: Union[str, ParsedDoc],
     doc_id: str,
-    persist_dir: str = "./chroma_db"
+    version: Optional[str] = None,
+    owner: str = DEFAULT_OWNER
 ) -> Chroma:
     """
-    Split text into chunks and add to Chroma vector store with unique per-chunk IDs.
-    Uses Hugging Face Endpoint API for embeddings (no local heavy models).
+    Split text into chunks and sync them into the Chroma vector store.
+    Only chunks that are new since the last run are embedded; chunks that
+    disappeared from the doc are deleted.
     """
-    # Ensure persistence directory exists
-    Path(persist_dir).mkdir(parents=True, exist_ok=True)
-
-    # Load embeddings (API-based)
-    embedding_fn = get_embeddings_model()
-
-    # Initialize or get vectordb
-    vectordb = get_vectordb(persist_dir)
-    if vectordb is None:
-        vectordb = Chroma(persist_directory=persist_dir, embedding_function=embedding_fn)
-
-    # Hash for doc
-    base_id = hashlib.md5(doc_id.encode()).hexdigest()[:8]
-
-    # Split text
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=50)
-    chunks = [c for c in text_splitter.split_text(content) if c.strip()]
+    # Split text (once)
+    chunks = [c for c in chunk_document(content) if c.text.strip()]
     if not chunks:
         logger.warning(f"⚠️ Document '{doc_id}' has no valid chunks, skipping.")
-        return vectordb
-
-    # Unique chunk IDs
-    chunk_ids = [f"{doc_id}_{base_id}_{i}" for i in range(len(chunks))]
-
-    # Skip if already exists
-    try:
-        existing = vectordb.get(ids=chunk_ids)
-        if existing and existing["ids"]:
-            logger.info(f"ℹ️ Document '{doc_id}' already exists in DB. Skipping embedding.")
-            return vectordb
-    except Exception as e:
-        logger.debug(f"No existing chunks found for '{doc_id}': {e}")
-
-    # Add texts
-    try:
-        vectordb.add_texts(
-            texts=chunks,
-            metadatas=[{"doc_id": doc_id} for _ in chunks],
-            ids=chunk_ids
-        )
-        vectordb.persist()
-    except Exception as e:
-        logger.error(f"❌ Failed to add texts for doc '{doc_id}': {e}")
-        raise
-
-    logger.info(f"✅ Document '{doc_id}' processed with {len(chunks)} chunks.")
-    return vectordb
+        return get_vectordb(owner)
+
+    chunks, chunk_ids = make_chunk_ids(doc_id, chunks)
+    add_indices, removed_ids = plan_doc_update(doc_id, chunk_ids, owner)
+    if not add_indices and not removed_ids:
+        logger.info(f"ℹ️ Document '{doc_id}' unchanged in DB. Skipping embedding.")
+        get_manifest(owner).record(doc_id, chunk_ids, version)
+        return get_vectordb(owner)
+
+    embeddings = embed_chunks([chunks[i] for i in add_indices]) if add_indices else []
+    return apply_doc_update(
+        doc_id, chunks, chunk_ids, add_indices, embeddings, removed_ids, version, owner
+    )
@@ -0,0 +1,358 @@
+# app/workflows/ingest_jobs.py
+
+import os
+import json
+import uuid
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.workflows.process_docs import process_user_docs, process_single_doc
+
+logger = logging.getLogger(__name__)
+
+INGEST_JOBS_PATH = os.getenv("INGEST_JOBS_PATH", "./ingest_jobs/jobs.sqlite")
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+JOB_FLUSH_SECONDS = float(os.getenv("INGEST_JOB_FLUSH_SECONDS", "1"))
+# A "running" job whose heartbeat is older than this belongs to a dead process
+JOB_STALE_SECONDS = float(os.getenv("INGEST_JOB_STALE_SECONDS", "60"))
+# Running jobs refresh their heartbeat (and poll for cancel) this often, progress or not
+JOB_HEARTBEAT_SECONDS = float(os.getenv("INGEST_JOB_HEARTBEAT_SECONDS", "10"))
+MAX_JOB_ERRORS = 100
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+_PROGRESS_FIELDS = ("docs_total", "docs_done", "docs_skipped", "docs_failed", "chunks_embedded")
+
+
+# -----------------------------
+# Running-job progress
+# -----------------------------
+class _Progress:
+    """Counters updated from pipeline threads, flushed to SQLite at most every JOB_FLUSH_SECONDS."""
+
+    def __init__(self, job_id: str, attempt: int, doc_ids: Optional[List[str]]):
+        self.job_id = job_id
+        self.attempt = attempt
+        # No selection → the total grows as the Drive listing is streamed
+        self.total_known = bool(doc_ids)
+        self.lock = threading.Lock()
+        self.counts = {name: 0 for name in _PROGRESS_FIELDS}
+        self.counts["docs_total"] = len(doc_ids or [])
+        self.errors: List[Dict[str, Any]] = []
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self.lost = False  # requeued elsewhere as stale → this run must not write its outcome
+        self.last_flush = 0.0
+
+    def __call__(self, event: str, data: Any):
+        with self.lock:
+            if event == "listed":
+                if not self.total_known:
+                    self.counts["docs_total"] += 1
+            elif event == "completed":
+                self.counts["docs_done"] += 1
+                self.counts["chunks_embedded"] += len(data.add_indices)
+            elif event == "skipped":
+                self.counts["docs_skipped"] += 1
+            elif event == "failed":
+                self.counts["docs_failed"] += 1
+                if len(self.errors) < MAX_JOB_ERRORS:
+                    self.errors.append(data)
+
+
+# -----------------------------
+# Job manager (SQLite-persisted queue + worker threads)
+# -----------------------------
+class IngestJobManager:
+    """
+    Ingestion jobs persisted in SQLite. Worker threads claim queued jobs
+    atomically, so several uvicorn workers can share the same job table.
+    Jobs left queued/running by a restart are picked up again; docs already
+    indexed are skipped by the manifest, so nothing is re-embedded.
+    """
+
+    def __init__(self, path: str = INGEST_JOBS_PATH, workers: int = INGEST_JOB_WORKERS):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                user_key TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                doc_ids TEXT,
+                status TEXT NOT NULL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                docs_total INTEGER NOT NULL DEFAULT 0,
+                docs_done INTEGER NOT NULL DEFAULT 0,
+                docs_skipped INTEGER NOT NULL DEFAULT 0,
+                docs_failed INTEGER NOT NULL DEFAULT 0,
+                chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                errors TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+            """
+        )
+        self._conn.commit()
+        self._running: Dict[str, _Progress] = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_sweep = 0.0
+
+    # ---- SQLite helpers ----
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _fetchone(self, sql: str, params=()):
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            try:
+                return self._conn.execute(sql, params).fetchone()
+            finally:
+                self._conn.row_factory = None
+
+    def _fetchall(self, sql: str, params=()):
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            finally:
+                self._conn.row_factory = None
+
+    # ---- public API ----
+    def start(self):
+        """Requeue jobs orphaned by a restart, then start the worker threads."""
+        resumed = self._sweep_stale(force=True)
+        queued = self._fetchone("SELECT COUNT(*) AS n FROM jobs WHERE status = ?", (QUEUED,))["n"]
+        if self._threads:
+            return
+        for n in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"ingest-job-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"🧵 Ingestion job workers started: {self.workers} ({queued} queued, {resumed} resumed)")
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for progress in list(self._running.values()):
+            progress.cancel.set()
+
+    def submit(self, user_key: str, doc_ids: Optional[List[str]] = None, kind: str = "docs") -> str:
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (job_id, user_key, kind, doc_ids, status, docs_total, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, user_key, kind, json.dumps(doc_ids) if doc_ids else None, QUEUED, len(doc_ids or []), time.time())
+        )
+        self._wakeup.set()
+        logger.info(f"📥 Ingestion job {job_id} queued ({kind}, {len(doc_ids or [])} docs)")
+        return job_id
+
+    def get(self, job_id: str, user_key: Optional[str] = None) -> Optional[dict]:
+        row = self._fetchone("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        if row is None or (user_key is not None and row["user_key"] != user_key):
+            return None
+        return self._describe(row)
+
+    def list(self, user_key: str, limit: int = 20) -> List[dict]:
+        rows = self._fetchall(
+            "SELECT * FROM jobs WHERE user_key = ? ORDER BY created_at DESC LIMIT ?", (user_key, limit)
+        )
+        return [self._describe(row) for row in rows]
+
+    def cancel(self, job_id: str, user_key: Optional[str] = None) -> Optional[dict]:
+        job = self.get(job_id, user_key)
+        if job is None or job["status"] in FINISHED:
+            return job
+        # Queued → cancelled right away; running → flagged, the worker stops at its next flush/heartbeat
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED)
+        )
+        self._execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+        progress = self._running.get(job_id)
+        if progress is not None:
+            progress.cancel.set()
+        return self.get(job_id, user_key)
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._fetchall("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+    # ---- internals ----
+    def _sweep_stale(self, force: bool = False) -> int:
+        """
+        Requeue running jobs whose heartbeat stopped (their process died);
+        ones a user already asked to cancel are closed instead. Runs from the
+        claim loop, so jobs of a crashed worker are resumed by the survivors.
+        """
+        now = time.time()
+        if not force and now - self._last_sweep < JOB_STALE_SECONDS / 2:
+            return 0
+        self._last_sweep = now
+        resumed = self._execute(
+            "UPDATE jobs SET status = CASE WHEN cancel_requested = 1 THEN ? ELSE ? END, "
+            "finished_at = CASE WHEN cancel_requested = 1 THEN ? ELSE finished_at END "
+            "WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (CANCELLED, QUEUED, now, RUNNING, now - JOB_STALE_SECONDS)
+        ).rowcount
+        if resumed and not force:
+            logger.warning(f"♻️ Requeued {resumed} stale ingestion job(s)")
+            self._wakeup.set()
+        return resumed
+
+    def _describe(self, row) -> dict:
+        job = {key: row[key] for key in row.keys() if key not in ("doc_ids", "errors", "result", "cancel_requested")}
+        job["doc_ids"] = json.loads(row["doc_ids"]) if row["doc_ids"] else None
+        job["cancel_requested"] = bool(row["cancel_requested"])
+        job["errors"] = json.loads(row["errors"]) if row["errors"] else []
+        job["result"] = json.loads(row["result"]) if row["result"] else None
+
+        progress = self._running.get(row["job_id"])
+        if progress is not None:
+            with progress.lock:
+                job.update(progress.counts)
+                job["errors"] = list(progress.errors)
+
+        handled = job["docs_done"] + job["docs_skipped"] + job["docs_failed"]
+        job["progress"] = round(handled / job["docs_total"], 3) if job["docs_total"] else None
+        job["eta_seconds"] = None
+        if job["status"] == RUNNING and job["started_at"] and handled and job["docs_total"] > handled:
+            rate = handled / max(time.time() - job["started_at"], 1e-6)
+            job["eta_seconds"] = round((job["docs_total"] - handled) / rate, 1)
+        return job
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        row = self._fetchone(
+            "SELECT job_id FROM jobs WHERE status = ? AND cancel_requested = 0 ORDER BY created_at LIMIT 1", (QUEUED,)
+        )
+        if row is None:
+            return None
+        now = time.time()
+        claimed = self._execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ?, "
+            "docs_done = 0, docs_skipped = 0, docs_failed = 0, chunks_embedded = 0, errors = NULL "
+            "WHERE job_id = ? AND status = ?",
+            (RUNNING, now, now, row["job_id"], QUEUED)
+        ).rowcount
+        if not claimed:
+            return None  # another worker (or process) got it first
+        return self._fetchone("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],))
+
+    def _flush(self, progress: _Progress, force: bool = False):
+        now = time.time()
+        if not force and now - progress.last_flush < JOB_FLUSH_SECONDS:
+            return
+        progress.last_flush = now
+        with progress.lock:
+            counts = dict(progress.counts)
+            errors = json.dumps(progress.errors)
+        updated = self._execute(
+            f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in counts)}, errors = ?, heartbeat_at = ? "
+            "WHERE job_id = ? AND status = ? AND attempts = ?",
+            (*counts.values(), errors, now, progress.job_id, RUNNING, progress.attempt)
+        ).rowcount
+        if not updated:
+            # Swept as stale (e.g. a long stall) and requeued or cancelled: stop, the other run owns it
+            if not progress.lost:
+                logger.warning(f"⚠️ Ingestion job {progress.job_id} was taken over, stopping this run")
+            progress.lost = True
+            progress.cancel.set()
+            return
+        # Cancellation may have been requested from another process
+        row = self._fetchone("SELECT cancel_requested FROM jobs WHERE job_id = ?", (progress.job_id,))
+        if row is not None and row["cancel_requested"]:
+            progress.cancel.set()
+
+    def _heartbeat(self, progress: _Progress):
+        """Keeps heartbeat_at fresh and picks up cancel requests while a stage runs without progress events."""
+        while not progress.done.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self._flush(progress, force=True)
+            except Exception as e:
+                logger.warning(f"⚠️ Heartbeat failed for ingestion job {progress.job_id}: {e}")
+
+    def _worker(self):
+        while not self._stop.is_set():
+            self._sweep_stale()
+            job = self._claim()
+            if job is None:
+                self._wakeup.wait(timeout=2.0)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: sqlite3.Row):
+        job_id, user_key = job["job_id"], job["user_key"]
+        doc_ids = json.loads(job["doc_ids"]) if job["doc_ids"] else None
+        progress = _Progress(job_id, job["attempts"], doc_ids)
+        self._running[job_id] = progress
+        threading.Thread(
+            target=self._heartbeat, args=(progress,), name=f"ingest-heartbeat-{job_id[:8]}", daemon=True
+        ).start()
+        logger.info(f"🚚 Ingestion job {job_id} started (attempt {job['attempts']})")
+
+        def on_progress(event: str, data: Any):
+            progress(event, data)
+            self._flush(progress)
+
+        status, result = COMPLETED, None
+        try:
+            if job["kind"] == "doc":
+                result = process_single_doc(doc_ids[0], user_key, cancel=progress.cancel)
+                if result.get("cancelled"):
+                    pass
+                elif "error" in result:
+                    on_progress("failed", {"doc_id": doc_ids[0], "stage": "fetch", "error": result["error"]})
+                    # The job's only doc failed → the job failed; `result` keeps the error
+                    status = FAILED
+                else:
+                    with progress.lock:
+                        progress.counts["docs_done"] = 1
+                        progress.counts["chunks_embedded"] = result["chunks_added"]
+            else:
+                result = process_user_docs(doc_ids, user_key, progress=on_progress, cancel=progress.cancel)
+            if progress.cancel.is_set():
+                status = CANCELLED
+        except Exception as e:
+            logger.exception(f"❌ Ingestion job {job_id} failed: {e}")
+            status, result = FAILED, {"error": str(e)}
+        finally:
+            progress.done.set()
+            self._flush(progress, force=True)
+            self._running.pop(job_id, None)
+
+        if progress.lost:
+            return
+        if self._stop.is_set() and status == CANCELLED:
+            # Shutting down, not a user cancel → leave it for the next start
+            self._execute(
+                "UPDATE jobs SET status = ? WHERE job_id = ? AND attempts = ?", (QUEUED, job_id, progress.attempt)
+            )
+            return
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE job_id = ? AND attempts = ?",
+            (status, json.dumps(result, default=str), time.time(), job_id, progress.attempt)
+        )
+        logger.info(f"🏁 Ingestion job {job_id} {status}")
+
+
+job_manager = IngestJobManager()
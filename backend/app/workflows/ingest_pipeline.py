@@ -0,0 +1,213 @@
+# app/workflows/ingest_pipeline.py
+
+import os
+import queue
+import threading
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# Stage concurrency limits (threads per stage)
+# -----------------------------
+FETCH_WORKERS = int(os.getenv("INGEST_FETCH_WORKERS", "4"))  # concurrent Docs batch requests
+SPLIT_WORKERS = int(os.getenv("INGEST_SPLIT_WORKERS", "2"))
+EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", "1"))  # Chroma = single SQLite writer
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "32"))  # backpressure between stages
+
+_SENTINEL = object()
+
+# progress(event, data): "completed" → item, "skipped"/"failed" → entry dict
+ProgressFn = Callable[[str, Any], None]
+
+
+class SkipItem(Exception):
+    """Raised (or yielded by a fan-out stage) to drop an item without counting it as a failure."""
+
+    def __init__(self, reason: str, doc_id: Optional[str] = None):
+        super().__init__(reason)
+        self.doc_id = doc_id
+
+
+class ItemFailed(Exception):
+    """Yielded by a fan-out stage to report one failed item of a batch."""
+
+    def __init__(self, doc_id: str, error: Exception):
+        super().__init__(str(error))
+        self.doc_id = doc_id
+
+
+@dataclass
+class IngestItem:
+    doc_id: str
+    name: str = ""
+    version: Optional[str] = None  # Drive modifiedTime/headRevisionId#chunker fingerprint
+    content: Optional[Any] = None  # ParsedDoc (or raw text) until chunked
+    chunks: List[Any] = field(default_factory=list)  # chunking.Chunk
+    chunk_ids: List[str] = field(default_factory=list)
+    add_indices: List[int] = field(default_factory=list)  # chunks not yet in the index
+    removed_ids: List[str] = field(default_factory=list)  # stale chunks to delete
+    embeddings: List[List[float]] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    fan_out: bool = False  # fn takes a batch and yields items / SkipItem / ItemFailed
+
+
+@dataclass
+class PipelineResult:
+    completed: List[Any] = field(default_factory=list)
+    skipped: List[Dict[str, Any]] = field(default_factory=list)
+    failed: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+# -----------------------------
+# Thread-pool staged pipeline
+# -----------------------------
+class StagedPipeline:
+    """
+    Run items through a chain of stages, each with its own worker threads.
+    Stages are connected by bounded queues, so a slow stage applies
+    backpressure upstream instead of buffering the whole corpus in memory.
+    A failure in one item is recorded and never stops the other items.
+    Setting `cancel` stops feeding new items; items already in flight are
+    reported as skipped ("cancelled").
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = QUEUE_SIZE):
+        if not stages:
+            raise ValueError("StagedPipeline needs at least one stage")
+        for stage in stages:
+            stage.workers = max(1, stage.workers)
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(
+        self,
+        items: Iterable[Any],
+        progress: Optional[ProgressFn] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> PipelineResult:
+        result = PipelineResult()
+        lock = threading.Lock()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [stage.workers for stage in self.stages]
+        started = time.perf_counter()
+
+        def forward(index: int, item: Any):
+            if index + 1 < len(self.stages):
+                queues[index + 1].put(item)
+            else:
+                with lock:
+                    result.completed.append(item)
+                notify("completed", item)
+
+        def skipped(doc_id, stage: Stage, reason: str):
+            entry = {"doc_id": doc_id, "stage": stage.name, "reason": reason}
+            with lock:
+                result.skipped.append(entry)
+            notify("skipped", entry)
+
+        def failed(doc_id, stage: Stage, error: str):
+            logger.error(f"❌ Stage '{stage.name}' failed for '{doc_id}': {error}")
+            entry = {"doc_id": doc_id, "stage": stage.name, "error": error}
+            with lock:
+                result.failed.append(entry)
+            notify("failed", entry)
+
+        def notify(event: str, data: Any):
+            if progress is None:
+                return
+            try:
+                progress(event, data)
+            except Exception as e:
+                logger.warning(f"⚠️ Progress callback failed: {e}")
+
+        def fan_out(index: int, stage: Stage, batch: List[Any]):
+            reported = set()
+            try:
+                for out in stage.fn(batch):
+                    reported.add(out.doc_id)
+                    if isinstance(out, SkipItem):
+                        skipped(out.doc_id, stage, str(out))
+                    elif isinstance(out, ItemFailed):
+                        failed(out.doc_id, stage, str(out))
+                    else:
+                        forward(index, out)
+            except SkipItem as e:
+                for d in batch:
+                    if d.doc_id not in reported:
+                        skipped(d.doc_id, stage, str(e))
+            except Exception as e:
+                # The stage gave up mid-batch: every doc it hadn't reported yet fails with it
+                for d in batch:
+                    if d.doc_id not in reported:
+                        failed(d.doc_id, stage, str(e))
+
+        def worker(index: int):
+            stage = self.stages[index]
+            while True:
+                item = queues[index].get()
+                if item is _SENTINEL:
+                    break
+                doc_id = getattr(item, "doc_id", None)
+                if cancel is not None and cancel.is_set():
+                    # Drain without work; a fan-out batch cancels each of its docs
+                    for d in (item if isinstance(item, list) else [item]):
+                        skipped(getattr(d, "doc_id", None), stage, "cancelled")
+                    continue
+                t0 = time.perf_counter()
+                if stage.fan_out:
+                    fan_out(index, stage, item)
+                    continue
+                try:
+                    out = stage.fn(item)
+                except SkipItem as e:
+                    skipped(doc_id, stage, str(e))
+                    continue
+                except Exception as e:
+                    failed(doc_id, stage, str(e))
+                    continue
+                if isinstance(out, IngestItem):
+                    out.timings[stage.name] = time.perf_counter() - t0
+                forward(index, out)
+
+            # Last worker of this stage to exit closes the next stage
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    queues[index + 1].put(_SENTINEL)
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                t = threading.Thread(target=worker, args=(index,), name=f"ingest-{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        try:
+            for item in items:
+                if cancel is not None and cancel.is_set():
+                    break
+                queues[0].put(item)
+        finally:
+            # Always drain the workers, even if the item source raised
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_SENTINEL)
+            for t in threads:
+                t.join()
+
+        result.elapsed = time.perf_counter() - started
+        return result
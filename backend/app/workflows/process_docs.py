@@ -1,92 +1,252 @@
 # app/workflows/process_docs.py
 
-from typing import Optional, List
-from app.services.google_service import get_doc_content, list_docs
-from app.services.vector_store_service import create_vector_store_from_text
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from functools import partial
+from typing import Iterator, Optional, List
+from app.services.google_service import get_doc_structure, iter_doc_contents, iter_docs, DOCS_BATCH_SIZE
+from app.services.chunking import chunk_document, chunker_fingerprint, CHUNK_STRATEGY
+from app.services.vector_store_service import (
+    make_chunk_ids,
+    plan_doc_update,
+    embed_chunks,
+    apply_doc_update,
+)
+from app.services.index_manifest import get_manifest, doc_version
+from app.services.partitions import DEFAULT_OWNER
+from app.workflows.ingest_pipeline import (
+    StagedPipeline,
+    Stage,
+    IngestItem,
+    SkipItem,
+    ItemFailed,
+    ProgressFn,
+    FETCH_WORKERS,
+    SPLIT_WORKERS,
+    EMBED_WORKERS,
+    UPSERT_WORKERS,
+)
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
 
+# -----------------------------
+# Pipeline stages
+# -----------------------------
+def _fetch_stage(batch: List[IngestItem], user_key: str = DEFAULT_OWNER) -> Iterator[object]:
+    """
+    Fan-out stage: fetch a batch of docs in one Google batch HTTP request.
+    Yields exactly one outcome per doc of the batch.
+    """
+    pending = {}
+    try:
+        manifest = get_manifest(user_key)
+    except Exception as e:
+        for item in batch:
+            yield ItemFailed(item.doc_id, e)
+        return
+    for item in batch:
+        try:
+            unchanged = bool(item.version) and manifest.get_version(item.doc_id) == item.version
+        except Exception as e:
+            yield ItemFailed(item.doc_id, e)
+            continue
+        if unchanged:
+            yield SkipItem("unchanged since last index", item.doc_id)
+        else:
+            pending[item.doc_id] = item
+    if not pending:
+        return
+
+    logger.info(f"Fetching {len(pending)} documents in one batch request")
+    for doc_id, parsed, error in iter_doc_contents(
+        list(pending), user_key, batch_size=len(pending), structured=True
+    ):
+        item = pending[doc_id]
+        if error is not None:
+            yield ItemFailed(doc_id, error)
+        elif not parsed.text.strip():
+            logger.warning(f"Document {item.name} is empty. Skipping.")
+            yield SkipItem("empty document", doc_id)
+        else:
+            item.content = parsed
+            yield item
+
+
+def _split_stage(item: IngestItem) -> IngestItem:
+    chunks = [c for c in chunk_document(item.content) if c.text.strip()]
+    if not chunks:
+        raise SkipItem("no valid chunks")
+    item.chunks, item.chunk_ids = make_chunk_ids(item.doc_id, chunks)
+    item.content = None  # chunks are all we need from here on
+    return item
+
+
+def _embed_stage(item: IngestItem, user_key: str = DEFAULT_OWNER) -> IngestItem:
+    item.add_indices, item.removed_ids = plan_doc_update(item.doc_id, item.chunk_ids, user_key)
+    if item.add_indices:
+        item.embeddings = embed_chunks([item.chunks[i] for i in item.add_indices])
+    return item
+
+
+def _upsert_stage(item: IngestItem, user_key: str = DEFAULT_OWNER) -> IngestItem:
+    apply_doc_update(
+        item.doc_id,
+        item.chunks,
+        item.chunk_ids,
+        item.add_indices,
+        item.embeddings,
+        item.removed_ids,
+        item.version,
+        user_key
+    )
+    item.embeddings = []
+    return item
+
+
+def build_ingest_pipeline(
+    user_key: str = DEFAULT_OWNER,
+    fetch_workers: int = FETCH_WORKERS,  # concurrent batch requests
+    split_workers: int = SPLIT_WORKERS,
+    embed_workers: int = EMBED_WORKERS,
+    upsert_workers: int = UPSERT_WORKERS,
+) -> StagedPipeline:
+    return StagedPipeline([
+        Stage("fetch", partial(_fetch_stage, user_key=user_key), fetch_workers, fan_out=True),
+        Stage("split", _split_stage, split_workers),
+        Stage("embed", partial(_embed_stage, user_key=user_key), embed_workers),
+        Stage("upsert", partial(_upsert_stage, user_key=user_key), upsert_workers),
+    ])
+
+
 # -----------------------------
 # Process multiple selected docs
 # -----------------------------
-def process_user_docs(selected_doc_ids: Optional[List[str]] = None):
+def process_user_docs(
+    selected_doc_ids: Optional[List[str]] = None,
+    user_key: str = DEFAULT_OWNER,
+    progress: Optional[ProgressFn] = None,
+    cancel: Optional[threading.Event] = None
+):
     """
     Fetch selected docs from Google Drive, create vector store, and persist.
-    
+    Docs flow through a fetch → split → embed → upsert pipeline where every
+    stage runs concurrently; a failing doc is reported without aborting the rest.
+    Docs whose Drive version matches the manifest are not fetched at all, and
+    changed docs only embed their new chunks.
+
     Args:
-        selected_doc_ids (List[str], optional): List of Google Doc IDs to process. 
+        selected_doc_ids (List[str], optional): List of Google Doc IDs to process.
             If None, all docs are processed.
-    
+        user_key (str): Google user id; docs are read with their token and
+            indexed into their partition.
+        progress: optional callback, also called with ("listed", doc_id) for
+            every doc taken from the Drive listing.
+        cancel (threading.Event, optional): set it to stop the run early.
+
     Returns:
-        dict: Summary of processed docs
+        dict: Summary of processed, skipped and failed docs
     """
-    docs = list_docs()
-    if not docs:
+    selected = set(selected_doc_ids) if selected_doc_ids else None
+    names = {}
+    chunker = chunker_fingerprint()
+
+    def listed_items() -> Iterator[IngestItem]:
+        # Stream the Drive listing straight into the pipeline; stop early
+        # once every selected doc has been seen
+        for d in iter_docs(user_key):
+            if selected is not None and d["id"] not in selected:
+                continue
+            names[d["id"]] = d["name"]
+            if progress is not None:
+                progress("listed", d["id"])
+            yield IngestItem(doc_id=d["id"], name=d["name"], version=doc_version(d, chunker))
+            if selected is not None and len(names) == len(selected):
+                return
+
+    def batches() -> Iterator[List[IngestItem]]:
+        batch = []
+        for item in listed_items():
+            batch.append(item)
+            if len(batch) >= DOCS_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    result = build_ingest_pipeline(user_key).run(batches(), progress, cancel)
+    if not names:
         logger.warning("No documents found in Google Drive.")
         return {"message": "No documents found"}
 
-    # Filter only selected docs if provided
-    if selected_doc_ids:
-        docs = [d for d in docs if d["id"] in selected_doc_ids]
-
-    processed_docs = []
-    for doc in docs:
-        logger.info(f"Processing document: {doc['name']} ({doc['id']})")
-        content = get_doc_content(doc["id"])
-        if content:
-            # Create/Update Chroma vector store
-            vectordb = create_vector_store_from_text(content, doc["id"])
-            
-            # Count chunks
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=50)
-            chunks = text_splitter.split_text(content)
-
-            processed_docs.append({
-                "doc_id": doc["id"],
-                "name": doc["name"],
-                "chunks": len(chunks)
-            })
-        else:
-            logger.warning(f"Document {doc['name']} is empty. Skipping.")
+    processed_docs = [
+        {
+            "doc_id": item.doc_id,
+            "name": item.name,
+            "chunks": len(item.chunks),
+            "chunks_added": len(item.add_indices),
+            "chunks_removed": len(item.removed_ids)
+        }
+        for item in result.completed
+    ]
+    for entry in result.skipped + result.failed:
+        entry["name"] = names.get(entry["doc_id"], "")
 
-    logger.info("✅ All selected docs processed and stored in Chroma.")
+    logger.info(
+        f"✅ Ingestion finished in {result.elapsed:.2f}s: {len(processed_docs)} processed, "
+        f"{len(result.skipped)} skipped, {len(result.failed)} failed."
+    )
     return {
         "message": "Selected docs processed and stored in Chroma ✅",
-        "processed_docs": processed_docs
+        "processed_docs": processed_docs,
+        "chunk_strategy": CHUNK_STRATEGY,
+        "skipped_docs": result.skipped,
+        "failed_docs": result.failed,
+        "elapsed_seconds": round(result.elapsed, 3)
     }
 
 
 # -----------------------------
 # Process single document
 # -----------------------------
-def process_single_doc(doc_id: str):
+def process_single_doc(doc_id: str, user_key: str = DEFAULT_OWNER, cancel: Optional[threading.Event] = None):
     """
     Fetch ONE doc by ID, create vector store, and persist.
 
     Args:
         doc_id (str): Google Doc ID
+        user_key (str): Google user id
+        cancel (threading.Event, optional): checked between stages; nothing
+            is written to the index once it is set.
 
     Returns:
         dict: Processing result
     """
-    content = get_doc_content(doc_id)
-    if not content:
+    def cancelled() -> bool:
+        return cancel is not None and cancel.is_set()
+
+    cancelled_result = {"message": f"Processing of {doc_id} cancelled", "doc_id": doc_id, "cancelled": True}
+    content = get_doc_structure(doc_id, user_key)
+    if cancelled():
+        return cancelled_result
+    if content is None or not content.text.strip():
         logger.error(f"Document {doc_id} not found or empty.")
         return {"error": f"Document {doc_id} not found or empty"}
 
-    # Create/Update Chroma vector store
-    vectordb = create_vector_store_from_text(content, doc_id)
-
-    # Count chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=50)
-    chunks = text_splitter.split_text(content)
+    item = IngestItem(doc_id=doc_id, content=content)
+    try:
+        item = _embed_stage(_split_stage(item), user_key)
+        if cancelled():
+            return cancelled_result
+        item = _upsert_stage(item, user_key)
+    except SkipItem:
+        pass
 
-    logger.info(f"✅ Document {doc_id} processed and stored in Chroma with {len(chunks)} chunks.")
+    logger.info(f"✅ Document {doc_id} processed and stored in Chroma with {len(item.chunks)} chunks.")
     return {
         "message": f"Document {doc_id} processed and stored in Chroma ✅",
         "doc_id": doc_id,
-        "chunks": len(chunks)
+        "chunks": len(item.chunks),
+        "chunks_added": len(item.add_indices),
+        "chunks_removed": len(item.removed_ids)
     }
@@ -0,0 +1,72 @@
+# benchmarks/compare.py
+"""
+Side-by-side diff of two benchmark reports:
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+
+import sys
+import json
+from typing import Dict, Iterator, Tuple
+
+# metric name suffix → True if bigger is better
+_HIGHER_IS_BETTER = ("docs_per_sec", "chunks_per_sec", "qps", "recall")
+
+
+def _flatten(report: dict) -> Dict[str, float]:
+    flat = {}
+    for run in report.get("runs", []):
+        prefix = f"{run['docs']} docs"
+        ingest = run.get("ingest", {})
+        for key in ("docs_per_sec", "chunks_per_sec", "elapsed_s"):
+            if ingest.get(key) is not None:
+                flat[f"{prefix} / ingest {key}"] = ingest[key]
+        search = run.get("search", {})
+        for kind in ("hnsw", "selected_docs", "bm25"):
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if key in search.get(kind, {}):
+                    flat[f"{prefix} / search {kind} {key}"] = search[kind][key]
+        if search.get("source_doc_recall") is not None:
+            flat[f"{prefix} / search source_doc_recall"] = search["source_doc_recall"]
+        for q in run.get("query", []):
+            for key in ("p50_ms", "p95_ms", "p99_ms", "qps"):
+                if key in q:
+                    flat[f"{prefix} / query {q['mode']} x{q['concurrency']} {key}"] = q[key]
+        memory = run.get("memory", {})
+        if memory.get("peak_rss_mb") is not None:
+            flat[f"{prefix} / peak_rss_mb"] = memory["peak_rss_mb"]
+    return flat
+
+
+def compare(baseline: dict, candidate: dict) -> Iterator[Tuple[str, float, float, float, bool]]:
+    """(metric, baseline, candidate, % change, regressed) for every metric in both reports."""
+    old, new = _flatten(baseline), _flatten(candidate)
+    for name in old:
+        if name not in new:
+            continue
+        before, after = old[name], new[name]
+        change = (after - before) / before * 100 if before else 0.0
+        higher_is_better = name.endswith(_HIGHER_IS_BETTER)
+        regressed = change < 0 if higher_is_better else change > 0
+        yield name, before, after, change, regressed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        raise SystemExit("usage: python -m benchmarks.compare BASELINE.json CANDIDATE.json")
+    with open(argv[0]) as f:
+        baseline = json.load(f)
+    with open(argv[1]) as f:
+        candidate = json.load(f)
+
+    rows = list(compare(baseline, candidate))
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'metric':<{width}}  {'baseline':>10}  {'candidate':>10}  {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        flag = "  ▼" if regressed and abs(change) >= 5 else ""
+        print(f"{name:<{width}}  {before:>10.2f}  {after:>10.2f}  {change:>+7.1f}%{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/corpus.py
+
+import random
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+
+# -----------------------------
+# Deterministic synthetic corpus
+# -----------------------------
+VOCAB_SIZE = 4000
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "xe", "zu", "an", "el", "or", "ish", "tor", "pha"]
+
+
+@lru_cache(maxsize=8)
+def vocabulary(seed: int = 7, size: int = VOCAB_SIZE) -> Tuple[List[str], List[float]]:
+    """Pseudo-words with Zipf weights, so term frequencies look like natural text."""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    ordered = sorted(words)
+    rng.shuffle(ordered)
+    weights = [1.0 / rank for rank in range(1, size + 1)]
+    return ordered, weights
+
+
+@dataclass(frozen=True)
+class SyntheticCorpus:
+    """
+    `n_docs` Google Docs generated on demand from (seed, index): nothing is
+    held in memory, and the same seed always yields the same corpus.
+    """
+
+    n_docs: int
+    seed: int = 7
+    sections: int = 4
+    paragraphs_per_section: int = 3
+    words_per_paragraph: int = 60
+
+    def doc_id(self, index: int) -> str:
+        return f"bench-{self.seed}-{index:06d}"
+
+    def index_of(self, doc_id: str) -> int:
+        return int(doc_id.rsplit("-", 1)[1])
+
+    def _rng(self, index: int, salt: int = 0) -> random.Random:
+        return random.Random(self.seed * 1_000_003 + index * 97 + salt)
+
+    def _words(self, rng: random.Random, n: int) -> List[str]:
+        words, weights = vocabulary(self.seed)
+        return rng.choices(words, weights=weights, k=n)
+
+    def metadata(self, index: int) -> dict:
+        """One Drive `files.list` entry."""
+        return {
+            "id": self.doc_id(index),
+            "name": f"Synthetic doc {index}",
+            "modifiedTime": "2024-01-01T00:00:00.000Z",
+            "headRevisionId": f"rev-{self.seed}-{index}",
+        }
+
+    def paragraphs(self, index: int) -> List[Tuple[str, str]]:
+        """(style, text) pairs: a title, then headings each followed by body paragraphs."""
+        rng = self._rng(index)
+        out = [("TITLE", f"Synthetic doc {index}")]
+        for s in range(self.sections):
+            out.append(("HEADING_1", " ".join(self._words(rng, 3)).capitalize()))
+            for _ in range(self.paragraphs_per_section):
+                out.append(("NORMAL_TEXT", " ".join(self._words(rng, self.words_per_paragraph)).capitalize() + "."))
+        return out
+
+    def document(self, index: int) -> dict:
+        """Docs API `documents.get` response body."""
+        content = []
+        for style, text in self.paragraphs(index):
+            content.append({
+                "paragraph": {
+                    "elements": [{"textRun": {"content": text + "\n"}}],
+                    "paragraphStyle": {"namedStyleType": style},
+                }
+            })
+        return {"documentId": self.doc_id(index), "title": f"Synthetic doc {index}", "body": {"content": content}}
+
+    def question(self, n: int, words: int = 8) -> Tuple[str, str]:
+        """(question, doc_id it was drawn from): words sampled from one body paragraph."""
+        rng = self._rng(n, salt=1)
+        index = rng.randrange(self.n_docs)
+        body = [text for style, text in self.paragraphs(index) if style == "NORMAL_TEXT"]
+        tokens = rng.choice(body).rstrip(".").lower().split()
+        start = rng.randrange(max(1, len(tokens) - words))
+        return "What does " + " ".join(tokens[start:start + words]) + " mean?", self.doc_id(index)
@@ -0,0 +1,160 @@
+# benchmarks/fake_hf_server.py
+"""
+Local stand-in for the HF endpoints used by app/services/hf_client.py,
+with fault injection for exercising retries, hedging and the breaker:
+
+    python -m benchmarks.fake_hf_server --port 8089 --error-rate 0.1 --slow-rate 0.05
+    HF_INFERENCE_URL=http://127.0.0.1:8089 HF_CHAT_URL=http://127.0.0.1:8089/v1 uvicorn app.main:app
+
+Routes: POST /models/{model}/pipeline/feature-extraction,
+POST /v1/chat/completions (JSON or SSE with "stream": true), GET /stats.
+"""
+
+import json
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from benchmarks.fakes import FakeEmbeddings, FakeLatency
+
+
+class FaultConfig:
+    def __init__(self, error_rate: float = 0.0, rate_limit_rate: float = 0.0, slow_rate: float = 0.0,
+                 slow_ms: float = 3000.0, seed: int = 7):
+        self.error_rate = error_rate  # → 503
+        self.rate_limit_rate = rate_limit_rate  # → 429 + Retry-After
+        self.slow_rate = slow_rate  # → extra slow_ms before answering (tail latency)
+        self.slow_ms = slow_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+
+def make_handler(latency: FakeLatency, faults: FaultConfig):
+    embeddings = FakeEmbeddings(FakeLatency(scale=0))  # vectors only; latency applied here
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0, "slow": 0}
+    stats_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def _count(self, key: str):
+            with stats_lock:
+                stats[key] += 1
+
+        def _json(self, status: int, body, headers: Optional[dict] = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _inject_fault(self) -> bool:
+            draw = faults.draw()
+            if draw < faults.error_rate:
+                self._count("errors")
+                self._json(503, {"error": "Model is overloaded"})
+                return True
+            if draw < faults.error_rate + faults.rate_limit_rate:
+                self._count("rate_limited")
+                self._json(429, {"error": "Rate limit reached"}, {"Retry-After": "1"})
+                return True
+            if draw < faults.error_rate + faults.rate_limit_rate + faults.slow_rate:
+                self._count("slow")
+                latency.sleep(faults.slow_ms)
+            return False
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with stats_lock:
+                    self._json(200, dict(stats))
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            self._count("requests")
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self._inject_fault():
+                return
+            if self.path.endswith("/pipeline/feature-extraction"):
+                inputs = payload.get("inputs", [])
+                texts = [inputs] if isinstance(inputs, str) else inputs
+                latency.sleep(latency.embed_ms + latency.embed_per_text_ms * len(texts))
+                vectors = [embeddings._embed(t) for t in texts]
+                self._json(200, vectors[0] if isinstance(inputs, str) else vectors)
+            elif self.path.endswith("/chat/completions"):
+                self._chat(payload)
+            else:
+                self._json(404, {"error": "not found"})
+
+        def _chat(self, payload: dict):
+            prompt = json.dumps(payload.get("messages", []))
+            seed = sum(prompt.encode()) % 1000
+            tokens = [f"tok{(seed + i * 7919) % 1000} " for i in range(min(48, payload.get("max_tokens", 48)))]
+            if not payload.get("stream"):
+                latency.sleep(latency.chat_ttft_ms + latency.chat_token_ms * len(tokens))
+                self._json(200, {
+                    "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": {"completion_tokens": len(tokens)},
+                })
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            latency.sleep(latency.chat_ttft_ms)
+            for i, token in enumerate(tokens):
+                if i:
+                    latency.sleep(latency.chat_token_ms)
+                event = {"choices": [{"index": 0, "delta": {"content": token}}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, latency: Optional[FakeLatency] = None,
+          faults: Optional[FaultConfig] = None) -> ThreadingHTTPServer:
+    """Start in a daemon thread; port 0 picks a free one (see server.server_address)."""
+    server = ThreadingHTTPServer((host, port), make_handler(latency or FakeLatency(), faults or FaultConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-hf", daemon=True).start()
+    return server
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fake HF embeddings + chat endpoints")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--latency-scale", type=float, default=1.0)
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    p.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction answered with 429")
+    p.add_argument("--slow-rate", type=float, default=0.0, help="fraction delayed by --slow-ms")
+    p.add_argument("--slow-ms", type=float, default=3000.0)
+    args = p.parse_args()
+
+    faults = FaultConfig(args.error_rate, args.rate_limit_rate, args.slow_rate, args.slow_ms)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FakeLatency(scale=args.latency_scale), faults))
+    print(f"🧪 Fake HF endpoints on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# benchmarks/fakes.py
+
+import time
+import asyncio
+import threading
+import zlib
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from benchmarks.corpus import SyntheticCorpus
+
+
+# -----------------------------
+# Simulated network latency
+# -----------------------------
+@dataclass
+class FakeLatency:
+    """Milliseconds per simulated round trip; `scale` multiplies all of them (0 → pure CPU)."""
+
+    drive_list_ms: float = 150.0
+    docs_get_ms: float = 120.0
+    docs_batch_ms: float = 400.0
+    docs_batch_per_doc_ms: float = 10.0
+    embed_ms: float = 80.0
+    embed_per_text_ms: float = 2.0
+    chat_ttft_ms: float = 300.0
+    chat_token_ms: float = 15.0
+    scale: float = 1.0
+
+    def sleep(self, ms: float):
+        if ms * self.scale > 0:
+            time.sleep(ms * self.scale / 1000)
+
+    async def asleep(self, ms: float):
+        if ms * self.scale > 0:
+            await asyncio.sleep(ms * self.scale / 1000)
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+# -----------------------------
+# Embeddings endpoint
+# -----------------------------
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words vectors: every token maps to a fixed random
+    direction (seeded by crc32), so texts sharing words land close together
+    and retrieval behaves like it would with a real model.
+    """
+
+    def __init__(self, latency: FakeLatency, dim: int = 384):
+        self.latency = latency
+        self.dim = dim
+        self.calls = 0
+        self.texts = 0
+        self._token_vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            vector = np.random.default_rng(zlib.crc32(token.encode())).standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def _embed(self, text: str) -> List[float]:
+        total = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            total += self._token_vector(token.strip(".,?!"))
+        norm = float(np.linalg.norm(total))
+        return (total / norm if norm else total).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+        self.latency.sleep(self.latency.embed_ms + self.latency.embed_per_text_ms * len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+# -----------------------------
+# Chat endpoint
+# -----------------------------
+class FakeChatModel(BaseChatModel):
+    """Chat model with a fixed time-to-first-token and per-token delay; the reply depends only on the prompt."""
+
+    latency: Any = None  # FakeLatency
+    answer_tokens: int = 48
+
+    @property
+    def _llm_type(self) -> str:
+        return "documind-fake-chat"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        seed = zlib.crc32(prompt.encode())
+        return [f"tok{(seed + i * 7919) % 1000}" for i in range(self.answer_tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages)
+        self.latency.sleep(self.latency.chat_ttft_ms + self.latency.chat_token_ms * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages)
+        await self.latency.asleep(self.latency.chat_ttft_ms + self.latency.chat_token_ms * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        self.latency.sleep(self.latency.chat_ttft_ms)
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                self.latency.sleep(self.latency.chat_token_ms)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+
+
+# -----------------------------
+# Google Drive / Docs API
+# -----------------------------
+class _Request:
+    """Mimics googleapiclient's HttpRequest: `execute()` runs one simulated round trip."""
+
+    def __init__(self, load, latency_ms: float, latency: FakeLatency):
+        self.load = load
+        self.latency_ms = latency_ms
+        self.latency = latency
+
+    def execute(self, http=None):
+        self.latency.sleep(self.latency_ms)
+        return self.load()
+
+
+class _Batch:
+    """Mimics BatchHttpRequest: one round trip for every request added."""
+
+    def __init__(self, callback, latency: FakeLatency):
+        self.callback = callback
+        self.latency = latency
+        self.requests = []
+
+    def add(self, request: _Request, request_id: str):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        self.latency.sleep(self.latency.docs_batch_ms + self.latency.docs_batch_per_doc_ms * len(self.requests))
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.load(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+
+class FakeDocsService:
+    def __init__(self, corpus: SyntheticCorpus, latency: FakeLatency):
+        self.corpus = corpus
+        self.latency = latency
+
+    def documents(self):
+        return self
+
+    def get(self, documentId: str):
+        index = self.corpus.index_of(documentId)
+        return _Request(lambda: self.corpus.document(index), self.latency.docs_get_ms, self.latency)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(callback, self.latency)
+
+
+class FakeDriveService:
+    def __init__(self, corpus: SyntheticCorpus, latency: FakeLatency):
+        self.corpus = corpus
+        self.latency = latency
+
+    def files(self):
+        return self
+
+    def list(self, q=None, pageSize: int = 100, pageToken: Optional[str] = None, fields=None):
+        start = int(pageToken or 0)
+        end = min(start + pageSize, self.corpus.n_docs)
+
+        def load():
+            page = {"files": [self.corpus.metadata(i) for i in range(start, end)]}
+            if end < self.corpus.n_docs:
+                page["nextPageToken"] = str(end)
+            return page
+
+        return _Request(load, self.latency.drive_list_ms, self.latency)
+
+
+class FakeGoogle:
+    """Per-owner fake Drive + Docs services, dispatched like google_service.get_service."""
+
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self.corpora: Dict[str, SyntheticCorpus] = {}
+
+    def get_service(self, api: str, version: str, user_key="user"):
+        corpus = self.corpora.get(user_key)
+        if corpus is None:
+            return None  # same as an unauthenticated user
+        if api == "drive":
+            return FakeDriveService(corpus, self.latency)
+        return FakeDocsService(corpus, self.latency)
+
+
+# -----------------------------
+# Wiring into the app
+# -----------------------------
+def install_fakes(latency: FakeLatency, models: bool = True) -> Dict[str, Any]:
+    """
+    Swap the external services for fakes while keeping every layer of our own
+    code (batcher, cache, pipeline, Chroma, BM25, context builder) real.
+    With `models=False` the HF client talks to fake_hf_server over HTTP instead.
+    Must run before anything calls get_embeddings()/get_chat_model().
+    """
+    from app.services import embedding_service, google_service
+    from app.workflows import query_docs
+
+    google = FakeGoogle(latency)
+    google_service.get_service = google.get_service
+    fakes = {"google": google, "embeddings": None, "chat": None}
+    if models:
+        fakes["embeddings"] = FakeEmbeddings(latency)
+        embedding_service._build_base_model = lambda: fakes["embeddings"]
+        fakes["chat"] = query_docs.chat_model = FakeChatModel(latency=latency)
+    return fakes
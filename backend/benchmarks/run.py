@@ -0,0 +1,175 @@
+# benchmarks/run.py
+"""
+Ingestion / retrieval benchmarks against local fakes of the Drive/Docs API,
+the embeddings endpoint and the chat endpoint (no network, no credentials).
+
+    cd backend
+    python -m benchmarks.run --sizes 1000,10000 --concurrency 1,4,16 --out results.json
+    python -m benchmarks.compare baseline.json results.json
+    python -m benchmarks.run --hf-server --hf-error-rate 0.05 --hf-slow-rate 0.02
+
+With --hf-server the embeddings and chat calls go over HTTP through the
+resilient HF client to an in-process fake_hf_server (with fault injection)
+instead of in-process fakes.
+
+Everything between the fakes is the real code: Google batch fetch + parse,
+chunking, the embedding batcher, Chroma, BM25, context building, chains.
+All stores live in a scratch --workdir, so runs never touch ./chroma_db.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+logger = logging.getLogger("benchmarks")
+
+
+def _ints(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="DocuMind ingestion / query benchmarks with local fakes")
+    p.add_argument("--sizes", type=_ints, default=[1000], help="corpus sizes in docs, e.g. 1000,10000,100000")
+    p.add_argument("--scenarios", default="ingest,search,query", help="comma-separated subset of ingest,search,query")
+    p.add_argument("--concurrency", type=_ints, default=[1, 4, 16], help="query concurrency levels")
+    p.add_argument("--requests", type=int, default=100, help="queries per concurrency level")
+    p.add_argument("--search-queries", type=int, default=200, help="queries for the index-only search scenario")
+    p.add_argument("--modes", default="hybrid", help="retrieval modes for the query scenario (vector,lexical,hybrid)")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--latency-scale", type=float, default=1.0, help="multiply every simulated latency (0 = CPU only)")
+    p.add_argument("--latency", action="append", default=[], metavar="FIELD=MS",
+                   help="override one simulated latency, e.g. --latency embed_ms=40 (see FakeLatency)")
+    p.add_argument("--answer-cache", action="store_true", help="keep the answer cache on during query load")
+    p.add_argument("--embedding-cache", action="store_true", help="keep the on-disk embedding cache on")
+    p.add_argument("--hf-server", action="store_true", help="serve embeddings/chat from fake_hf_server over HTTP")
+    p.add_argument("--hf-error-rate", type=float, default=0.0, help="fake server: fraction of 503s")
+    p.add_argument("--hf-rate-limit-rate", type=float, default=0.0, help="fake server: fraction of 429s")
+    p.add_argument("--hf-slow-rate", type=float, default=0.0, help="fake server: fraction delayed by --hf-slow-ms")
+    p.add_argument("--hf-slow-ms", type=float, default=3000.0)
+    p.add_argument("--workdir", help="where Chroma / BM25 / manifest files go (default: a temp dir, removed after)")
+    p.add_argument("--out", help="write the JSON report here (default: stdout)")
+    return p.parse_args(argv)
+
+
+def configure_environment(args, workdir: str):
+    """Point every store at the scratch dir; must run before any app module is imported."""
+    paths = {
+        "CHROMA_PERSIST_DIR": "chroma_db",
+        "LEXICAL_INDEX_PATH": "lexical_index/chunks.sqlite",
+        "INDEX_MANIFEST_PATH": "index_manifest/manifest.sqlite",
+        "EMBEDDING_CACHE_PATH": "embedding_cache/embeddings.sqlite",
+        "INGEST_JOBS_PATH": "ingest_jobs/jobs.sqlite",
+    }
+    for name, rel in paths.items():
+        os.environ[name] = os.path.join(workdir, rel)
+    os.environ["TOKEN_STORE_BACKEND"] = "memory"
+    os.environ["EMBEDDING_BACKEND"] = "hf"  # replaced by the fake; never reaches the network
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "true" if args.embedding_cache else "false"
+    if not args.answer_cache:
+        os.environ["ANSWER_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["ANSWER_CACHE_SIMILARITY"] = "0"
+    # Tokenizers come from local files if configured, else the word-count estimate
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+
+def build_latency(args):
+    from benchmarks.fakes import FakeLatency
+
+    latency = FakeLatency(scale=args.latency_scale)
+    for override in args.latency:
+        field_name, _, value = override.partition("=")
+        if not hasattr(latency, field_name) or field_name == "scale":
+            raise SystemExit(f"Unknown latency field '{field_name}'")
+        setattr(latency, field_name, float(value))
+    return latency
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    scenarios = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+    unknown = scenarios - {"ingest", "search", "query"}
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {sorted(unknown)}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="documind-bench-")
+    configure_environment(args, workdir)
+    latency = build_latency(args)
+    server = None
+    if args.hf_server:
+        from benchmarks.fake_hf_server import FaultConfig, serve
+        faults = FaultConfig(args.hf_error_rate, args.hf_rate_limit_rate, args.hf_slow_rate, args.hf_slow_ms, args.seed)
+        server = serve(latency=latency, faults=faults)
+        host, port = server.server_address[:2]
+        os.environ["HF_INFERENCE_URL"] = f"http://{host}:{port}"
+        os.environ["HF_CHAT_URL"] = f"http://{host}:{port}/v1"
+
+    # App modules read their config at import time
+    from benchmarks.corpus import SyntheticCorpus
+    from benchmarks.fakes import install_fakes
+    from benchmarks import scenarios as bench
+    from app.services.embedding_service import get_embedding_stats
+    from app.services.hf_client import get_hf_client_stats
+
+    fakes = install_fakes(latency, models=not args.hf_server)
+    started = time.perf_counter()
+    runs = []
+    try:
+        for size in args.sizes:
+            corpus = SyntheticCorpus(n_docs=size, seed=args.seed)
+            owner = f"bench-{args.seed}-{size}"  # one partition (collection, BM25, manifest) per size
+            run = {"docs": size, "owner": owner}
+            if "ingest" in scenarios:
+                run["ingest"] = bench.ingest(fakes, corpus, owner)
+            if "search" in scenarios:
+                run["search"] = bench.search(corpus, owner, queries=args.search_queries)
+            if "query" in scenarios:
+                run["query"] = bench.query(
+                    corpus, owner, args.concurrency, args.requests, [m.strip() for m in args.modes.split(",")]
+                )
+            run["memory"] = {"rss_mb": bench.rss_mb(), "peak_rss_mb": bench.peak_rss_mb()}
+            runs.append(run)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "scenarios": sorted(scenarios),
+            "answer_cache": args.answer_cache,
+            "embedding_cache": args.embedding_cache,
+            "hf_server": args.hf_server,
+            "latency": latency.as_dict(),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        },
+        "embedding": get_embedding_stats(),
+        "hf_client": get_hf_client_stats(),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        logger.info(f"📝 Report written to {args.out}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
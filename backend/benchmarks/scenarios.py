@@ -0,0 +1,198 @@
+# benchmarks/scenarios.py
+
+import os
+import sys
+import math
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from app.services.metrics import STAGE_SECONDS
+from app.services.embedding_service import get_embeddings, get_embedding_stats
+from app.services.retrieval import vector_search, lexical_search
+from app.services.store_manager import get_vectordb
+from app.workflows.process_docs import process_user_docs
+from app.workflows.query_docs import ask_doc
+
+from benchmarks.corpus import SyntheticCorpus
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Measurement helpers
+# -----------------------------
+def percentiles(values_ms: Sequence[float]) -> Dict[str, float]:
+    """Nearest-rank percentiles, in ms."""
+    if not values_ms:
+        return {"count": 0}
+    ordered = sorted(values_ms)
+
+    def rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": round(rank(50), 2),
+        "p95_ms": round(rank(95), 2),
+        "p99_ms": round(rank(99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size (Linux /proc), else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _stage_breakdown(before: dict, after: dict) -> Dict[str, Dict[str, float]]:
+    """Per-stage count / total seconds recorded between two STAGE_SECONDS snapshots."""
+    stages = {}
+    for key, (count, total) in after.items():
+        prev_count, prev_total = before.get(key, (0, 0.0))
+        if count > prev_count:
+            n, seconds = count - prev_count, total - prev_total
+            stages[key[0]] = {"count": n, "total_s": round(seconds, 3), "mean_ms": round(seconds / n * 1000, 2)}
+    return stages
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+def ingest(fakes: dict, corpus: SyntheticCorpus, owner: str) -> dict:
+    """Full Drive listing → fetch → split → embed → upsert run over the whole corpus."""
+    fakes["google"].corpora[owner] = corpus
+    batcher_before = get_embedding_stats().get("batcher", {})
+    rss_before = rss_mb()
+    snapshot = STAGE_SECONDS.snapshot()
+
+    started = time.perf_counter()
+    result = process_user_docs(None, owner)
+    elapsed = time.perf_counter() - started
+
+    batcher = get_embedding_stats().get("batcher", {})
+    processed = result.get("processed_docs", [])
+    chunks = sum(d["chunks_added"] for d in processed)
+    logger.info(f"🏁 Ingested {len(processed)}/{corpus.n_docs} docs ({chunks} chunks) in {elapsed:.1f}s")
+    return {
+        "docs": corpus.n_docs,
+        "processed": len(processed),
+        "skipped": len(result.get("skipped_docs", [])),
+        "failed": len(result.get("failed_docs", [])),
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_sec": round(len(processed) / elapsed, 2) if elapsed else None,
+        "chunks": chunks,
+        "chunks_per_sec": round(chunks / elapsed, 2) if elapsed else None,
+        "embed_calls": batcher.get("batches", 0) - batcher_before.get("batches", 0),
+        "embedded_texts": batcher.get("endpoint_texts", 0) - batcher_before.get("endpoint_texts", 0),
+        "stages": _stage_breakdown(snapshot, STAGE_SECONDS.snapshot()),
+        "rss_mb_before": rss_before,
+        "rss_mb_after": rss_mb(),
+    }
+
+
+def search(corpus: SyntheticCorpus, owner: str, queries: int = 200, k: int = 20, selected_docs: int = 5) -> dict:
+    """
+    Index-only latency (question embeddings computed up front): HNSW over the
+    whole collection, exact search over a doc selection, and BM25.
+    """
+    db = get_vectordb(owner)
+    questions = [corpus.question(i) for i in range(queries)]
+    vectors = get_embeddings().embed_documents([q for q, _ in questions])
+
+    whole, selected, lexical, found = [], [], [], 0
+    for n, ((question, doc_id), vector) in enumerate(zip(questions, vectors)):
+        started = time.perf_counter()
+        result = db._collection.query(query_embeddings=[vector], n_results=k, include=["metadatas"])
+        whole.append((time.perf_counter() - started) * 1000)
+        found += any((m or {}).get("doc_id") == doc_id for m in result["metadatas"][0])
+
+        # The source doc plus a few neighbours, like a user's KB selection
+        doc_ids = [doc_id] + [corpus.doc_id((corpus.index_of(doc_id) + j + 1) % corpus.n_docs) for j in range(selected_docs - 1)]
+        started = time.perf_counter()
+        vector_search(db, vector, doc_ids, k, owner)
+        selected.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        lexical_search(question, None, k, owner)
+        lexical.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "chunks": db._collection.count(),
+        "k": k,
+        "hnsw": percentiles(whole),
+        "selected_docs": {"docs": selected_docs, **percentiles(selected)},
+        "bm25": percentiles(lexical),
+        "source_doc_recall": round(found / queries, 3) if queries else None,
+    }
+
+
+async def _query_load(corpus: SyntheticCorpus, owner: str, concurrency: int, requests: int, mode: str, offset: int):
+    pending = asyncio.Queue()
+    for n in range(requests):
+        pending.put_nowait(corpus.question(offset + n)[0])
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                question = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                await ask_doc(question, None, top_k=3, retrieval_mode=mode, owner=owner)
+                latencies.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                errors += 1
+                logger.warning(f"⚠️ Query failed: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def query(
+    corpus: SyntheticCorpus,
+    owner: str,
+    concurrency_levels: Sequence[int] = (1, 4, 16),
+    requests: int = 100,
+    modes: Sequence[str] = ("hybrid",)
+) -> List[dict]:
+    """End-to-end ask_doc latency (embed → retrieve → context → generate) under concurrent load."""
+    runs = []
+    offset = 10_000  # keep load questions distinct from the search scenario's
+    for mode in modes:
+        for concurrency in concurrency_levels:
+            snapshot = STAGE_SECONDS.snapshot()
+            latencies, errors, elapsed = asyncio.run(_query_load(corpus, owner, concurrency, requests, mode, offset))
+            offset += requests
+            runs.append({
+                "mode": mode,
+                "concurrency": concurrency,
+                "errors": errors,
+                "elapsed_s": round(elapsed, 3),
+                "qps": round(len(latencies) / elapsed, 2) if elapsed else None,
+                **percentiles(latencies),
+                "stages": _stage_breakdown(snapshot, STAGE_SECONDS.snapshot()),
+            })
+            logger.info(f"🏁 {mode} x{concurrency}: {runs[-1].get('p50_ms')} ms p50, {runs[-1]['qps']} qps")
+    return runs
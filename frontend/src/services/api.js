@@ -21,26 +21,59 @@ export async function checkAuth() {
   }
 }
 
-// 3️⃣ Fetch Google Docs list
-export async function fetchDocs() {
+// 3️⃣ Fetch Google Docs list (one page; pass nextCursor back for the next one)
+export async function fetchDocsPage(cursor = null, pageSize = 100) {
   try {
-    const res = await fetch(`${BASE}/documents/docx`, {
+    const params = new URLSearchParams({ page_size: String(pageSize) });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${BASE}/documents/docx?${params}`, {
       credentials: "include",
     });
     const data = await res.json();
     if (data.error) {
       console.error("Docs fetch error:", data.error);
-      return [];
+      return { docs: [], nextCursor: null };
     }
-    return data.docs || [];
+    return { docs: data.docs || [], nextCursor: data.next_cursor || null };
   } catch (err) {
     console.error("Fetch docs failed", err);
-    return [];
+    return { docs: [], nextCursor: null };
+  }
+}
+
+export async function fetchDocs() {
+  const { docs } = await fetchDocsPage();
+  return docs;
+}
+
+// Ingestion jobs: status + polling until finished
+export async function getJob(jobId) {
+  const res = await fetch(`${BASE}/documents/jobs/${jobId}`, {
+    credentials: "include",
+  });
+  if (!res.ok) throw new Error(`Job ${jobId} not found`);
+  return await res.json();
+}
+
+export async function cancelJob(jobId) {
+  const res = await fetch(`${BASE}/documents/jobs/${jobId}/cancel`, {
+    method: "POST",
+    credentials: "include",
+  });
+  return await res.json();
+}
+
+export async function waitForJob(jobId, { intervalMs = 2000, onProgress } = {}) {
+  for (;;) {
+    const job = await getJob(jobId);
+    onProgress?.(job);
+    if (["completed", "failed", "cancelled"].includes(job.status)) return job;
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
   }
 }
 
-// 4️⃣ Add selected docs to knowledge base
-export async function addDocsToKB(ids) {
+// 4️⃣ Add selected docs to knowledge base (queues a job, resolves when it finishes)
+export async function addDocsToKB(ids, { onProgress } = {}) {
   try {
     const res = await fetch(`${BASE}/documents/process_docs`, {
       method: "POST",
@@ -48,21 +81,25 @@ export async function addDocsToKB(ids) {
       credentials: "include",
       body: JSON.stringify(ids),
     });
-    return await res.json();
+    const { job_id } = await res.json();
+    const job = await waitForJob(job_id, { onProgress });
+    return { ...job.result, job };
   } catch (err) {
     console.error("Add docs failed", err);
     return { success: false };
   }
 }
 
-// 5️⃣ Summarize / process a single doc
-export async function summarizeDoc(id) {
+// 5️⃣ Summarize / process a single doc (queues a job, resolves when it finishes)
+export async function summarizeDoc(id, { onProgress } = {}) {
   try {
     const res = await fetch(`${BASE}/documents/process_doc/${id}`, {
       method: "POST",
       credentials: "include",
     });
-    return await res.json();
+    const { job_id } = await res.json();
+    const job = await waitForJob(job_id, { onProgress });
+    return { ...job.result, job };
   } catch (err) {
     console.error("Summarize failed", err);
     return { success: false };
@@ -129,3 +166,104 @@ export async function queryDocs(question, selectedDocIds = []) {
     return { answer: "Error", sources: [] };
   }
 }
+
+// 9️⃣ Query KB Docs with streamed answer (Server-Sent Events over POST)
+export async function streamQueryDocs(question, selectedDocIds = [], handlers = {}) {
+  const { onSources, onToken, onDone, onError } = handlers;
+  try {
+    const res = await fetch(`${BASE}/query/query_docs/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      credentials: "include",
+      body: JSON.stringify({
+        question: question || "",
+        selected_doc_ids: Array.isArray(selectedDocIds) ? selectedDocIds : [],
+      }),
+    });
+    if (!res.ok || !res.body) {
+      throw new Error(`Stream query failed with status ${res.status}`);
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) !== -1) {
+        const raw = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        const event = (raw.match(/^event: (.*)$/m) || [])[1];
+        const data = JSON.parse((raw.match(/^data: (.*)$/m) || [])[1] || "null");
+        if (event === "sources") onSources?.(data);
+        else if (event === "token") onToken?.(data);
+        else if (event === "done") onDone?.(data);
+        else if (event === "error") onError?.(data);
+      }
+    }
+  } catch (err) {
+    console.error("Stream query failed", err);
+    onError?.({ detail: err.message });
+  }
+}
+
+// 🔟 Batch query: many questions over one selection (results in request order)
+export async function queryDocsBatch(questions, selectedDocIds = [], { maxConcurrency } = {}) {
+  const res = await fetch(`${BASE}/query/query_docs/batch`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    credentials: "include",
+    body: JSON.stringify({
+      questions,
+      selected_doc_ids: Array.isArray(selectedDocIds) ? selectedDocIds : [],
+      max_concurrency: maxConcurrency,
+    }),
+  });
+  if (!res.ok) throw new Error(`Batch query failed with status ${res.status}`);
+  return await res.json();
+}
+
+// Same, streamed as NDJSON: onResult fires per question as soon as it is answered
+export async function streamQueryDocsBatch(questions, selectedDocIds = [], { onResult, onDone, onError, maxConcurrency } = {}) {
+  try {
+    const res = await fetch(`${BASE}/query/query_docs/batch/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      credentials: "include",
+      body: JSON.stringify({
+        questions,
+        selected_doc_ids: Array.isArray(selectedDocIds) ? selectedDocIds : [],
+        max_concurrency: maxConcurrency,
+      }),
+    });
+    if (!res.ok || !res.body) {
+      throw new Error(`Batch stream failed with status ${res.status}`);
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let sep;
+      while ((sep = buffer.indexOf("\n")) !== -1) {
+        const line = buffer.slice(0, sep).trim();
+        buffer = buffer.slice(sep + 1);
+        if (!line) continue;
+        const data = JSON.parse(line);
+        if (data.done) onDone?.();
+        else if ("index" in data) onResult?.(data);
+        else if (data.error) onError?.(data);
+      }
+    }
+  } catch (err) {
+    console.error("Batch stream failed", err);
+    onError?.({ error: err.message });
+  }
+}